@@ -0,0 +1,7 @@
+# Loaded by docker-entrypoint.sh for both server modes.
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (requests in flight) from /metrics
+    multiprocess.mark_process_dead(worker.pid)
@@ -24,6 +24,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings and query counts cover the whole stack
+    'tracker.instrumentation.RequestMetricsMiddleware',
+    # Right inside it, so the logged and aggregated bytes are those on the wire
+    'tracker.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -62,6 +66,9 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('POSTGRES_HOST', ''),
         'PORT': os.getenv('POSTGRES_PORT', ''),
+        # SQLite: take the write lock when a transaction starts, so select_for_update
+        # sections (settling a month) serialize instead of failing with "database is locked"
+        'OPTIONS': {} if os.getenv('POSTGRES_HOST') else {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
@@ -88,6 +95,56 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Report responses are cached per employee data version (tracker.report_cache).
+# REPORT_CACHE_URL picks the backend: unset -> local memory,
+# file:///path -> file-based, redis://host:port/db -> any Redis-compatible server.
+REPORT_CACHE_URL = os.getenv('REPORT_CACHE_URL', '')
+
+
+def _report_cache(url):
+    if url.startswith(('redis://', 'rediss://')):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}
+    if url.startswith('file://'):
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': url[len('file://'):]}
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'reports'}
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': _report_cache(REPORT_CACHE_URL),
+}
+REPORT_CACHE_ALIAS = 'reports'
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', str(7 * 24 * 3600)))
+
+# A request running the same SQL statement this many times is logged as a likely N+1
+REQUEST_METRICS_N_PLUS_ONE = int(os.getenv('REQUEST_METRICS_N_PLUS_ONE', '10'))
+
+# JSON and text responses of at least this many bytes are sent brotli- or gzip-compressed
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+# 0-11; 5 keeps the CPU per response near gzip's while still saving more bytes
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '5'))
+
+# Bearer token Prometheus must send to scrape /metrics; unset leaves it open (keep it off the public network)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# One line per request on tracker.requests; REQUEST_LOG_LEVEL=WARNING keeps only the N+1 warnings
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'tracker.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
@@ -99,6 +156,8 @@ CORS_ALLOWED_ORIGINS = [
         'http://localhost:5173,http://127.0.0.1:5173,http://localhost:3000'
     ).split(',') if o
 ]
+# Lets the SPA read the export file name and the request timings
+CORS_EXPOSE_HEADERS = ['Content-Disposition', 'Server-Timing']
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -108,6 +167,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DATETIME_FORMAT': '%Y-%m-%dT%H:%M:%SZ',
+    # JSON_RENDERER=rest_framework.renderers.JSONRenderer switches back to DRF's renderer
+    'DEFAULT_RENDERER_CLASSES': (
+        os.getenv('JSON_RENDERER', 'tracker.renderers.FastJSONRenderer'),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
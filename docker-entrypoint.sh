@@ -1,10 +1,30 @@
 #!/usr/bin/env sh
 set -e
 
+# Prometheus counters of all worker processes are shared through this directory
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/tracker-metrics}
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Report cache and ETag versions must be shared by the workers, or one worker
+# would answer 304 for data another has changed; set REPORT_CACHE_URL=redis://... to use Redis
+export REPORT_CACHE_URL=${REPORT_CACHE_URL:-file:///tmp/tracker-cache}
+
 echo "Running migrations..."
 python manage.py migrate --noinput
 
-echo "Starting Gunicorn..."
-exec gunicorn config.wsgi:application --bind 0.0.0.0:${PORT:-8000} --workers 3 --timeout 120
+# Start the counters from zero with the new workers
+rm -f "$PROMETHEUS_MULTIPROC_DIR"/*.db
+
+# SERVER_MODE=asgi (default) serves the async read views on uvicorn workers;
+# SERVER_MODE=wsgi keeps the previous sync gunicorn workers.
+# WEB_CONCURRENCY worker processes, WEB_THREADS threads per wsgi worker, WEB_TIMEOUT seconds.
+WORKERS=${WEB_CONCURRENCY:-3}
+TIMEOUT=${WEB_TIMEOUT:-120}
 
+if [ "${SERVER_MODE:-asgi}" = "wsgi" ]; then
+  echo "Starting Gunicorn (WSGI, ${WORKERS} workers x ${WEB_THREADS:-1} threads)..."
+  exec gunicorn config.wsgi:application --bind 0.0.0.0:${PORT:-8000} --workers "$WORKERS" --threads "${WEB_THREADS:-1}" --timeout "$TIMEOUT" --config config/gunicorn.py
+fi
 
+echo "Starting Gunicorn (ASGI, ${WORKERS} uvicorn workers)..."
+exec gunicorn config.asgi:application --bind 0.0.0.0:${PORT:-8000} --workers "$WORKERS" --worker-class uvicorn_worker.UvicornWorker --timeout "$TIMEOUT" --config config/gunicorn.py
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react'
 import { api } from '../lib/api'
+import { fetchAll } from '../lib/pagination'
 import { Link } from 'react-router-dom'
 import ProjectSelector from '../components/ProjectSelector'
 import { useProject } from '../context/ProjectContext'
@@ -23,23 +24,18 @@ export default function AdminDashboard(){
   const [ym, setYm] = useState({ year: new Date().getFullYear(), month: new Date().getMonth()+1 })
 
   useEffect(() => { (async () => {
-    const { data } = await api.get('/api/employees/')
+    const data = await fetchAll('/api/employees/', { fields: 'id,username' })
     setEmployees(data)
     if (data.length) setSelected(String(data[0].id))
   })() }, [])
 
   useEffect(() => { if(!selected) return; (async () => {
     const base = projectId ? { project: projectId } : {}
-    const [d,w,m,p] = await Promise.all([
-      api.get(`/api/reports/employee/${selected}/daily`, { params: { ...range, ...base } }),
-      api.get(`/api/reports/employee/${selected}/weekly`, { params: { ...range, ...base } }),
-      api.get(`/api/reports/employee/${selected}/monthly`, { params: { ...range, ...base } }),
-      api.get(`/api/reports/employee/${selected}/pie`, { params: { ...ym, ...base } }),
-    ])
-    setDaily(d.data.series)
-    setWeekly(w.data.series)
-    setMonthly(m.data.series)
-    setPie(p.data.series)
+    const { data } = await api.get(`/api/reports/employee/${selected}/dashboard/`, { params: { ...range, ...ym, ...base } })
+    setDaily(data.daily)
+    setWeekly(data.weekly)
+    setMonthly(data.monthly)
+    setPie(data.pie)
   })() }, [selected, JSON.stringify(range), JSON.stringify(ym), projectId])
 
   const colors = ['#60a5fa','#34d399','#f472b6','#f59e0b','#a78bfa','#f87171']
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react'
 import { api } from '../lib/api'
+import { fetchAll } from '../lib/pagination'
 import { Link, useNavigate } from 'react-router-dom'
 import { useToast } from '../ui/Toast'
 import { useAuth } from '../auth/AuthContext'
@@ -21,17 +22,14 @@ export default function AdminEmployees(){
   const { notify } = useToast()
 
   const load = async () => {
-    const { data } = await api.get('/api/employees/')
+    const data = await fetchAll('/api/employees/')
     setEmployees(data)
-    // fetch balances per employee in parallel
+    // fetch balances for all employees in one request
     try {
-      const results = await Promise.all(
-        data.map(u => api.get(`/api/reports/employee/${u.id}/income`))
-      )
+      const { data: income } = await api.get('/api/reports/income/')
       const map = {}
-      results.forEach((r, idx) => {
-        const u = data[idx]
-        map[u.id] = r.data
+      income.employees.forEach(row => {
+        map[row.employee_id] = row
       })
       setBalances(map)
     } catch (e) {
@@ -54,8 +52,10 @@ export default function AdminEmployees(){
 
   const updateRate = async (id, newRate) => {
     try {
+      // Applies from today on; earlier entries keep the rate they were logged at
       await api.patch(`/api/employees/${id}/rate/`, { hourly_rate_toman: Number(newRate)||0 })
       notify('Hourly rate updated', { type: 'success' })
+      await load()
     } catch (e) {
       notify('Update failed', { type: 'error' })
     }
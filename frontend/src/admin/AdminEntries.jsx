@@ -1,6 +1,8 @@
 import { useEffect, useMemo, useState } from 'react'
 import dayjs from 'dayjs'
-import { api } from '../lib/api'
+import { api, downloadFile } from '../lib/api'
+import { fetchAll, useCursorList } from '../lib/pagination'
+import LoadMore from '../components/LoadMore'
 import { Link } from 'react-router-dom'
 import ProjectSelector from '../components/ProjectSelector'
 import { useAuth } from '../auth/AuthContext'
@@ -19,13 +21,12 @@ export default function AdminEntries(){
   const [selected, setSelected] = useState('')
   const [mode, setMode] = useState('day') // day | week | month
   const [start, setStart] = useState(dayjs().format('YYYY-MM-DD'))
-  const [entries, setEntries] = useState([])
   const [projects, setProjects] = useState([])
   const [projectFilter, setProjectFilter] = useState('')
 
   useEffect(() => { (async () => {
-    const [{ data: emp }, { data: projs }] = await Promise.all([
-      api.get('/api/employees/'),
+    const [emp, { data: projs }] = await Promise.all([
+      fetchAll('/api/employees/', { fields: 'id,username' }),
       api.get('/api/projects/'),
     ])
     setEmployees(emp)
@@ -33,26 +34,23 @@ export default function AdminEntries(){
     setProjects(projs)
   })() }, [])
 
-  const load = async () => {
-    if (!selected) return
-    let params = {}
+  const params = useMemo(() => {
+    let range = {}
     if (mode === 'day') {
-      params = { date_from: start, date_to: start }
+      range = { date_from: start, date_to: start }
     } else if (mode === 'week') {
       const s = dayjs(start).startOf('week')
       const e = dayjs(start).endOf('week')
-      params = { date_from: s.format('YYYY-MM-DD'), date_to: e.format('YYYY-MM-DD') }
+      range = { date_from: s.format('YYYY-MM-DD'), date_to: e.format('YYYY-MM-DD') }
     } else {
       const s = dayjs(start).startOf('month')
       const e = dayjs(start).endOf('month')
-      params = { date_from: s.format('YYYY-MM-DD'), date_to: e.format('YYYY-MM-DD') }
+      range = { date_from: s.format('YYYY-MM-DD'), date_to: e.format('YYYY-MM-DD') }
     }
-    const projectQuery = projectFilter ? `&project=${projectFilter}` : ''
-    const { data } = await api.get(`/api/time-entries/?employee=${selected}${projectQuery}`, { params })
-    setEntries(data)
-  }
+    return { employee: selected, ...(projectFilter ? { project: projectFilter } : {}), ...range }
+  }, [selected, mode, start, projectFilter])
 
-  useEffect(() => { load() }, [selected, mode, start, projectFilter])
+  const { rows: entries, hasMore, loading, loadMore } = useCursorList('/api/time-entries/', params, { enabled: Boolean(selected) })
 
   return (
     <div className="p-4 space-y-4 max-w-5xl mx-auto">
@@ -65,7 +63,7 @@ export default function AdminEntries(){
         </div>
       </header>
 
-      <div className="card grid grid-cols-1 md:grid-cols-5 gap-3 items-end">
+      <div className="card grid grid-cols-1 md:grid-cols-6 gap-3 items-end">
         <div>
           <label className="block text-sm mb-1">Employee</label>
           <select className="w-full rounded-xl border p-2" value={selected} onChange={e=>setSelected(e.target.value)}>
@@ -93,6 +91,10 @@ export default function AdminEntries(){
             ))}
           </select>
         </div>
+        <div className="flex gap-2">
+          <button type="button" className="btn btn-secondary" disabled={!selected} onClick={() => downloadFile('/api/time-entries/export/', params, 'time-entries.csv')}>CSV</button>
+          <button type="button" className="btn btn-secondary" disabled={!selected} onClick={() => downloadFile('/api/time-entries/export/', { ...params, type: 'xlsx' }, 'time-entries.xlsx')}>XLSX</button>
+        </div>
       </div>
 
       <div className="card">
@@ -116,14 +118,14 @@ export default function AdminEntries(){
                   <td className="py-2 pr-4 whitespace-nowrap">{e.date}</td>
                   <td className="py-2 pr-4 whitespace-nowrap">{e.task_title_snapshot}</td>
                   <td className="py-2 pr-4 whitespace-nowrap">{e.project_name || '-'}</td>
-                  <td className="py-2 pr-4 whitespace-nowrap">{e.source === 'timer' ? 'Timer' : 'Manual'}</td>
+                  <td className="py-2 pr-4 whitespace-nowrap">{e.source === 'timer' ? 'Timer' : e.source === 'import' ? 'Import' : 'Manual'}</td>
                   <td className="py-2 pr-4 whitespace-nowrap">{e.start_time}</td>
                   <td className="py-2 pr-4 whitespace-nowrap">{e.end_time}</td>
                   <td className="py-2 pr-4 whitespace-nowrap"><Minutes value={e.duration_minutes} /></td>
                   <td className="py-2 pr-4">{e.short_description}</td>
                 </tr>
               ))}
-              {!entries.length && (
+              {!entries.length && !loading && (
                 <tr>
                   <td className="py-6 text-center text-gray-500" colSpan={8}>No entries</td>
                 </tr>
@@ -131,6 +133,7 @@ export default function AdminEntries(){
             </tbody>
           </table>
         </div>
+        <LoadMore hasMore={hasMore} loading={loading} onVisible={loadMore} />
       </div>
     </div>
   )
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react'
 import { api } from '../lib/api'
+import { fetchAll } from '../lib/pagination'
 import { Link, useNavigate } from 'react-router-dom'
 import { useToast } from '../ui/Toast'
 import { useAuth } from '../auth/AuthContext'
@@ -43,12 +44,12 @@ export default function AdminProjects(){
   }
 
   const loadMembers = async (projectId) => {
-    const [mRes, eRes] = await Promise.all([
+    const [mRes, emp] = await Promise.all([
       api.get(`/api/project-memberships/?project=${projectId}`),
-      api.get('/api/employees/'),
+      fetchAll('/api/employees/', { fields: 'id,username' }),
     ])
     setMemberships(mRes.data)
-    setEmployees(eRes.data)
+    setEmployees(emp)
     setNewMemberId('')
   }
 
@@ -1,31 +1,28 @@
-import { useEffect, useState } from 'react'
-import { api } from '../lib/api'
+import { useEffect, useMemo, useState } from 'react'
+import { fetchAll, useCursorList } from '../lib/pagination'
+import LoadMore from '../components/LoadMore'
 import { Link, useNavigate } from 'react-router-dom'
 import { useAuth } from '../auth/AuthContext'
 
 export default function AdminSettlements(){
   const { logout } = useAuth()
   const navigate = useNavigate()
-  const [rows, setRows] = useState([])
   const [employee, setEmployee] = useState('')
   const [employees, setEmployees] = useState([])
   const [year, setYear] = useState('')
   const [month, setMonth] = useState('')
 
-  const load = async () => {
-    const params = {}
-    if (employee) params.employee = employee
-    if (year) params.year = year
-    if (month) params.month = month
-    const [sRes, eRes] = await Promise.all([
-      api.get('/api/settlements/', { params }),
-      api.get('/api/employees/'),
-    ])
-    setRows(sRes.data)
-    setEmployees(eRes.data)
-  }
+  const params = useMemo(() => {
+    const p = {}
+    if (employee) p.employee = employee
+    if (year) p.year = year
+    if (month) p.month = month
+    return p
+  }, [employee, year, month])
 
-  useEffect(() => { load() }, [employee, year, month])
+  const { rows, hasMore, loading, loadMore, reload } = useCursorList('/api/settlements/', params)
+
+  useEffect(() => { fetchAll('/api/employees/', { fields: 'id,username' }).then(setEmployees) }, [])
 
   return (
     <div className="p-4 space-y-4 max-w-5xl mx-auto">
@@ -54,7 +51,7 @@ export default function AdminSettlements(){
           <input type="number" min={1} max={12} className="w-full rounded-xl border p-2" value={month} onChange={e=>setMonth(e.target.value)} />
         </div>
         <div>
-          <button className="btn btn-secondary" onClick={load}>Refresh</button>
+          <button className="btn btn-secondary" onClick={reload}>Refresh</button>
         </div>
       </div>
 
@@ -79,13 +76,14 @@ export default function AdminSettlements(){
                 <td className="py-2 pr-4">{new Date(r.settled_at).toLocaleString()}</td>
               </tr>
             ))}
-            {!rows.length && (
+            {!rows.length && !loading && (
               <tr>
                 <td className="py-6 text-center text-gray-500" colSpan={5}>No settlements</td>
               </tr>
             )}
           </tbody>
         </table>
+        <LoadMore hasMore={hasMore} loading={loading} onVisible={loadMore} />
       </div>
     </div>
   )
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react'
 import { api } from '../lib/api'
+import { fetchAll } from '../lib/pagination'
 import { Link } from 'react-router-dom'
 import ProjectSelector from '../components/ProjectSelector'
 import { useAuth } from '../auth/AuthContext'
@@ -14,7 +15,7 @@ export default function TasksAdmin(){
   const [title, setTitle] = useState('')
 
   const load = async () => {
-    const { data } = await api.get('/api/tasks/', { params: projectId ? { project: projectId } : {} })
+    const data = await fetchAll('/api/tasks/', projectId ? { project: projectId } : {})
     setTasks(data)
   }
   useEffect(() => { load() }, [projectId])
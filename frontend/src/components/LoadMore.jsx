@@ -0,0 +1,22 @@
+import { useEffect, useRef } from 'react'
+
+// Sentinel placed after a list; calls onVisible when scrolled into view
+export default function LoadMore({ hasMore, loading, onVisible }) {
+  const ref = useRef(null)
+
+  useEffect(() => {
+    if (!hasMore || !ref.current) return
+    const observer = new IntersectionObserver((items) => {
+      if (items.some(i => i.isIntersecting)) onVisible()
+    }, { rootMargin: '200px' })
+    observer.observe(ref.current)
+    return () => observer.disconnect()
+  }, [hasMore, onVisible])
+
+  if (!hasMore && !loading) return null
+  return (
+    <div ref={ref} className="py-3 text-center text-xs text-gray-500">
+      {loading ? 'Loading…' : ''}
+    </div>
+  )
+}
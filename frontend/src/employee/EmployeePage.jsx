@@ -1,6 +1,7 @@
-import { useEffect, useMemo, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import dayjs from 'dayjs'
 import { api } from '../lib/api'
+import { syncChanges } from '../lib/sync'
 import { useAuth } from '../auth/AuthContext'
 import { Link, useNavigate } from 'react-router-dom'
 import { useToast } from '../ui/Toast'
@@ -17,8 +18,9 @@ function Minutes({ value }) {
 }
 
 export default function EmployeePage() {
-  const [tasks, setTasks] = useState([])
-  const [entries, setEntries] = useState([])
+  // Local copy of entries/tasks/projects kept current through /api/sync/
+  const [synced, setSynced] = useState({ time_entries: [], tasks: [], projects: [] })
+  const syncState = useRef({ copy: null, cursor: null })
   const [income, setIncome] = useState(null)
   const monthLabel = useMemo(() => {
     if (!income) return ''
@@ -68,21 +70,30 @@ export default function EmployeePage() {
     return { minutes, overnight }
   }, [form.date, form.start_time, form.end_time])
 
+  // First call is a full load; after a mutation only the changed rows come back
   const load = async () => {
-    const [tRes, eRes, incomeRes] = await Promise.all([
-      api.get('/api/tasks/', { params: projectId ? { project: projectId } : {} }),
-      api.get('/api/time-entries/', { params: { project: projectId, date_from: dayjs().subtract(1,'day').format('YYYY-MM-DD'), date_to: dayjs().format('YYYY-MM-DD') } }),
+    const [result, incomeRes] = await Promise.all([
+      syncChanges(syncState.current.copy, syncState.current.cursor),
       api.get('/api/me/income/'),
     ])
-    setTasks(tRes.data)
-    setEntries(eRes.data)
+    syncState.current = result
+    setSynced(result.copy)
     setIncome(incomeRes.data)
   }
 
   useEffect(() => {
     setInitialLoading(true)
     load().finally(() => setInitialLoading(false))
-  }, [projectId])
+  }, [])
+
+  // Project filter and the today/yesterday window are applied locally, in the list endpoints' order
+  const tasks = useMemo(() => synced.tasks
+    .filter(t => !projectId || String(t.project) === String(projectId))
+    .sort((a, b) => b.created_at.localeCompare(a.created_at) || b.id - a.id), [synced, projectId])
+  const entries = useMemo(() => synced.time_entries
+    .filter(e => e.date === todayStr || e.date === yesterdayStr)
+    .filter(e => !projectId || String(e.project_id) === String(projectId))
+    .sort((a, b) => b.date.localeCompare(a.date) || b.start_time.localeCompare(a.start_time) || b.id - a.id), [synced, projectId, todayStr, yesterdayStr])
 
   
 
@@ -190,22 +201,25 @@ export default function EmployeePage() {
       } else {
         const endOfStart = start.endOf('day')
         const startOfNow = now.startOf('day')
-        await api.post('/api/time-entries/', {
-          task: timer.task,
-          date: start.format('YYYY-MM-DD'),
-          start_time: start.format('HH:mm'),
-          end_time: endOfStart.format('HH:mm'),
-          short_description: timer.short_description || null,
-          source: 'timer',
-        })
-        await api.post('/api/time-entries/', {
-          task: timer.task,
-          date: now.format('YYYY-MM-DD'),
-          start_time: startOfNow.format('HH:mm'),
-          end_time: now.format('HH:mm'),
-          short_description: timer.short_description || null,
-          source: 'timer',
-        })
+        // Both halves of an overnight session are saved together, all-or-nothing
+        await api.post('/api/time-entries/bulk/', [
+          {
+            task: timer.task,
+            date: start.format('YYYY-MM-DD'),
+            start_time: start.format('HH:mm'),
+            end_time: endOfStart.format('HH:mm'),
+            short_description: timer.short_description || null,
+            source: 'timer',
+          },
+          {
+            task: timer.task,
+            date: now.format('YYYY-MM-DD'),
+            start_time: startOfNow.format('HH:mm'),
+            end_time: now.format('HH:mm'),
+            short_description: timer.short_description || null,
+            source: 'timer',
+          },
+        ])
       }
       persistTimer(null)
       setElapsed(0)
@@ -112,3 +112,18 @@ api.interceptors.response.use(
 
 
 
+
+// Fetch an authenticated file (CSV/XLSX export) and hand it to the browser as a download
+export async function downloadFile(url, params, fallbackName) {
+  const res = await api.get(url, { params, responseType: 'blob' })
+  const disposition = res.headers['content-disposition'] || ''
+  const match = disposition.match(/filename="?([^";]+)"?/)
+  const href = URL.createObjectURL(res.data)
+  const link = document.createElement('a')
+  link.href = href
+  link.download = match ? match[1] : fallbackName
+  document.body.appendChild(link)
+  link.click()
+  link.remove()
+  URL.revokeObjectURL(href)
+}
@@ -3,6 +3,12 @@ export function extractErrorMessage(err, fallback='Something went wrong') {
   const data = err?.response?.data
   if (typeof data === 'string') return data
   if (data?.detail) return data.detail
+  if (Array.isArray(data)) {
+    // Bulk endpoints return one error object per submitted item
+    const messages = data.filter(item => item && Object.keys(item).length)
+      .map(item => extractErrorMessage({ response: { data: item } }, fallback))
+    return messages.join('\n') || fallback
+  }
   if (typeof data === 'object') {
     try {
       return Object.entries(data).map(([k,v]) => `${k}: ${Array.isArray(v)? v.join(', '): v}`).join('\n') || fallback
@@ -0,0 +1,67 @@
+import { useCallback, useEffect, useRef, useState } from 'react'
+import { api } from './api'
+
+// List endpoints use cursor pagination: { next, previous, results }
+export function cursorFrom(url) {
+  if (!url) return null
+  try {
+    return new URL(url).searchParams.get('cursor')
+  } catch {
+    return null
+  }
+}
+
+// For pickers that need every row: walk all pages with the largest page size
+export async function fetchAll(url, params = {}) {
+  const rows = []
+  let cursor = null
+  do {
+    const { data } = await api.get(url, { params: { ...params, page_size: 500, ...(cursor ? { cursor } : {}) } })
+    rows.push(...data.results)
+    cursor = cursorFrom(data.next)
+  } while (cursor)
+  return rows
+}
+
+// Incrementally loaded list; resets whenever url/params change
+export function useCursorList(url, params, { enabled = true, pageSize = 50 } = {}) {
+  const key = JSON.stringify(params)
+  const [rows, setRows] = useState([])
+  const [next, setNext] = useState(null)
+  const [loading, setLoading] = useState(false)
+  const generation = useRef(0)
+  const inFlight = useRef(false)
+
+  const fetchPage = useCallback(async (cursor, gen) => {
+    inFlight.current = true
+    setLoading(true)
+    try {
+      const { data } = await api.get(url, { params: { ...params, page_size: pageSize, ...(cursor ? { cursor } : {}) } })
+      if (gen !== generation.current) return
+      setRows(prev => cursor ? [...prev, ...data.results] : data.results)
+      setNext(cursorFrom(data.next))
+    } finally {
+      if (gen === generation.current) {
+        inFlight.current = false
+        setLoading(false)
+      }
+    }
+  }, [url, key, pageSize])
+
+  const reload = useCallback(() => {
+    const gen = ++generation.current
+    setNext(null)
+    return fetchPage(null, gen)
+  }, [fetchPage])
+
+  useEffect(() => {
+    if (enabled) reload()
+  }, [reload, enabled])
+
+  const loadMore = useCallback(() => {
+    if (!next || inFlight.current) return
+    return fetchPage(next, generation.current)
+  }, [next, fetchPage])
+
+  return { rows, hasMore: Boolean(next), loading, loadMore, reload }
+}
@@ -0,0 +1,29 @@
+import { api } from './api'
+
+const EMPTY = { time_entries: [], tasks: [], projects: [] }
+
+// Upsert changed rows by id and drop tombstones
+function merge(rows, { changed, deleted }) {
+  const replaced = new Set([...deleted, ...changed.map(r => r.id)])
+  return [...rows.filter(r => !replaced.has(r.id)), ...changed]
+}
+
+// Brings a local copy ({ time_entries, tasks, projects }) up to date through /api/sync/.
+// Pass cursor = null for a full load; returns the new copy and the cursor for next time.
+export async function syncChanges(local, cursor, params = {}) {
+  let copy = cursor ? local : EMPTY
+  let since = cursor
+  let more = true
+  while (more) {
+    const { data } = await api.get('/api/sync/', { params: { ...params, ...(since ? { since } : {}) } })
+    if (data.reset) copy = EMPTY
+    copy = {
+      time_entries: merge(copy.time_entries, data.time_entries),
+      tasks: merge(copy.tasks, data.tasks),
+      projects: merge(copy.projects, data.projects),
+    }
+    since = data.cursor
+    more = data.has_more
+  }
+  return { copy, cursor: since }
+}
@@ -1,5 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+
+from . import rates, rollups
 from .models import Task, TimeEntry, TimeEntryEdit, Assignment
+from .report_cache import bump_table_version, bump_version
 
 
 @admin.register(Task)
@@ -15,6 +19,28 @@ class TimeEntryAdmin(admin.ModelAdmin):
     list_filter = ('employee', 'date', 'is_deleted')
     search_fields = ('task_title_snapshot', 'short_description')
 
+    def save_model(self, request, obj, form, change):
+        old = TimeEntry.objects.select_related('task').get(pk=obj.pk) if change else None
+        rates.price([obj])
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            rollups.apply(rollups.contribution(old) if old else None, rollups.contribution(obj))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            rollups.apply(rollups.contribution(obj), None)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        # "Delete selected" bypasses delete_model, so the rollups and ledgers move here in one batch
+        with transaction.atomic():
+            entries = list(queryset.select_related('task').select_for_update())
+            rollups.apply_many((rollups.contribution(entry), None) for entry in entries)
+            super().delete_queryset(request, queryset)
+            for employee_id in {entry.employee_id for entry in entries}:
+                bump_version(employee_id)
+            bump_table_version(TimeEntry)
+
 
 @admin.register(TimeEntryEdit)
 class TimeEntryEditAdmin(admin.ModelAdmin):
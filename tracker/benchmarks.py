@@ -0,0 +1,190 @@
+import json
+import math
+import random
+from datetime import time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from . import ledger, rollups
+from .rates import FIRST_DAY
+from .report_cache import bump_table_version
+from .reporting import income_toman
+from .models import EmployeeProfile, HourlyRate, Project, ProjectMembership, Settlement, Task, TimeEntry, entry_bounds
+
+User = get_user_model()
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return None
+    return samples[max(math.ceil(pct / 100 * len(samples)) - 1, 0)]
+
+
+def summarize(seconds: List[float], **extra) -> Dict[str, Any]:
+    """Count and p50/p95/p99/mean in milliseconds of a list of durations in seconds."""
+    samples = sorted(seconds)
+    summary = {'n': len(samples)}
+    for pct in (50, 95, 99):
+        value = percentile(samples, pct)
+        summary[f'p{pct}_ms'] = round(value * 1000, 2) if value is not None else None
+    summary['mean_ms'] = round(sum(samples) / len(samples) * 1000, 2) if samples else None
+    summary.update(extra)
+    return summary
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Any]]) -> None:
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+
+
+def compare(baseline_path: str, results: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions of results against a saved baseline.
+
+    p95 may grow and throughput may drop by `tolerance` (0.2 = 20%) before it
+    counts; queries per call may not grow by more than half a query (averages
+    from loadtest), since query counts do not depend on the machine.
+    """
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before.get('queries') is not None and current.get('queries') is not None and current['queries'] > before['queries'] + 0.5:
+            regressions.append(f"{name}: {before['queries']} -> {current['queries']} queries")
+        if before.get('p95_ms') and current.get('p95_ms') and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if before.get('rps') and current.get('rps') is not None and current['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: {before['rps']} -> {current['rps']} req/s")
+    return regressions
+
+
+# Requests each screen of the SPA issues when it opens, as (label, path)
+Screen = List[Tuple[str, str]]
+
+
+def employee_screen(today) -> Screen:
+    """EmployeePage: tasks, today's and yesterday's entries, income."""
+    yesterday = today - timedelta(days=1)
+    return [
+        ('tasks', '/api/tasks/?page_size=500'),
+        ('time entries', f'/api/time-entries/?date_from={yesterday}&date_to={today}&page_size=500'),
+        ('my income', '/api/me/income/'),
+    ]
+
+
+def admin_screens(employee_id: int, today) -> Dict[str, Screen]:
+    """AdminDashboard, AdminEmployees and AdminSettlements."""
+    picker = ('employee picker', '/api/employees/?fields=id,username&page_size=500')
+    start = today - timedelta(days=6)
+    return {
+        'dashboard': [
+            picker,
+            ('dashboard', f'/api/reports/employee/{employee_id}/dashboard/?start={start}&end={today}&year={today.year}&month={today.month}'),
+        ],
+        'employees': [('employees', '/api/employees/?page_size=500'), ('income summary', '/api/reports/income/')],
+        'settlements': [('settlements', '/api/settlements/?page_size=50'), picker],
+    }
+
+
+def large_payloads(employee_id: int, today) -> Screen:
+    """The biggest responses of the API, for renderer and compression measurements."""
+    start = today - timedelta(days=29)
+    return [
+        ('time entries (30d)', f'/api/time-entries/?employee={employee_id}&date_from={start}&date_to={today}&page_size=500'),
+        ('time entries (all)', '/api/time-entries/?page_size=500'),
+        ('tasks', '/api/tasks/?page_size=500'),
+        ('settlements', '/api/settlements/?page_size=500'),
+        ('employees', '/api/employees/?page_size=500'),
+        ('income summary', '/api/reports/income/'),
+        ('dashboard', f'/api/reports/employee/{employee_id}/dashboard/?start={start}&end={today}&year={today.year}&month={today.month}'),
+    ]
+
+
+def entry_slot(n: int, today) -> Dict[str, str]:
+    """Body of the n-th one-minute entry today, then yesterday (left empty by seed(skip_recent_days=2))."""
+    n %= 2 * 1440
+    day = today if n < 1440 else today - timedelta(days=1)
+    start, end = n % 1440, (n + 1) % 1440
+    return {
+        'date': day.isoformat(),
+        'start_time': f'{start // 60:02d}:{start % 60:02d}',
+        'end_time': f'{end // 60:02d}:{end % 60:02d}',
+    }
+
+
+def seed(
+    employees: int = 40,
+    projects: int = 8,
+    tasks_per_project: int = 10,
+    days: int = 180,
+    entries_per_day: int = 4,
+    prefix: str = 'bench',
+    password: Optional[str] = None,
+    skip_recent_days: int = 0,
+    rng_seed: int = 0,
+) -> Dict[str, Any]:
+    """Create a deterministic data set with bulk inserts and rebuild its rollups and ledgers.
+
+    Entries cover `days` days ending `skip_recent_days` days before today, so a
+    load test can still log time today/yesterday without overlaps. About 5% of
+    entries are soft-deleted.
+    """
+    rng = random.Random(rng_seed)
+    admin = User(username=f'{prefix}_admin', is_staff=True)
+    staff = [User(username=f'{prefix}_{i}') for i in range(employees)]
+    # One hash shared by every seeded user; hashing per user dominates seeding time otherwise
+    if password:
+        admin.set_password(password)
+    else:
+        admin.set_unusable_password()
+    for user in staff:
+        user.password = admin.password
+    admin.save()
+    staff = User.objects.bulk_create(staff)
+    hourly_rates = {u.id: rng.randrange(50_000, 500_000, 10_000) for u in staff}
+    EmployeeProfile.objects.bulk_create(EmployeeProfile(user=u, hourly_rate_toman=hourly_rates[u.id]) for u in staff)
+    HourlyRate.objects.bulk_create(
+        HourlyRate(employee=u, effective_from=FIRST_DAY, hourly_rate_toman=hourly_rates[u.id]) for u in staff
+    )
+    project_rows = Project.objects.bulk_create(Project(name=f'{prefix}_{i}', created_by=admin) for i in range(projects))
+    tasks = Task.objects.bulk_create(
+        Task(title=f'{prefix}_{p.name}_{i}', project=p, created_by=admin)
+        for p in project_rows for i in range(tasks_per_project)
+    )
+    ProjectMembership.objects.bulk_create(
+        ProjectMembership(project=p, user=u, added_by=admin) for p in project_rows for u in staff
+    )
+
+    today = timezone.localdate()
+    batch = []
+    for employee in staff:
+        for offset in range(skip_recent_days, skip_recent_days + days):
+            day = today - timedelta(days=offset)
+            for slot in range(entries_per_day):
+                task = rng.choice(tasks)
+                start, end = time(8 + 2 * slot), time(9 + 2 * slot)
+                start_at, end_at = entry_bounds(day, start, end)
+                batch.append(TimeEntry(
+                    employee=employee, task=task, task_title_snapshot=task.title, date=day,
+                    start_time=start, end_time=end, duration_minutes=60, start_at=start_at, end_at=end_at,
+                    hourly_rate_toman=hourly_rates[employee.id], cost_toman=income_toman(60, hourly_rates[employee.id]),
+                    is_deleted=rng.random() < 0.05,
+                ))
+            if len(batch) >= 5000:
+                TimeEntry.objects.bulk_create(batch)
+                batch = []
+    TimeEntry.objects.bulk_create(batch)
+    first_year = (today - timedelta(days=skip_recent_days + days)).year
+    Settlement.objects.bulk_create(
+        Settlement(employee=u, year=y, month=m, amount_toman=1)
+        for u in staff for y in range(first_year, today.year + 1) for m in range(1, 13)
+    )
+    rollups.rebuild([u.id for u in staff])
+    ledger.reconcile([u.id for u in staff])
+    bump_table_version(User, EmployeeProfile, Project, Task, ProjectMembership, TimeEntry, Settlement)
+    return {'admin': admin, 'employees': staff, 'projects': project_rows, 'tasks': tasks, 'today': today}
@@ -0,0 +1,73 @@
+import brotli
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+# Exports in xlsx are zip files already; only text is worth compressing
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+
+
+def negotiate(accept_encoding: str):
+    """'br', 'gzip' or None for an Accept-Encoding header, honouring q-values; br wins ties."""
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    wildcard = weights.get('*', 0.0)
+    best = None
+    for coding in ('br', 'gzip'):
+        q = weights.get(coding, wildcard)
+        if q > 0 and (best is None or q > weights.get(best, wildcard)):
+            best = coding
+    return best
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli or gzip, as the client prefers, for text responses above a size threshold.
+
+    Bodies under RESPONSE_COMPRESSION_MIN_BYTES (and anything already encoded
+    or not text) go out as they are; the round trip costs more than the bytes
+    saved. Streaming responses are gzipped chunk by chunk. Strong ETags are
+    weakened as Django's GZipMiddleware does; the If-None-Match checks of the
+    views still match the weak form.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_bytes = getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024)
+        self.brotli_quality = getattr(settings, 'RESPONSE_BROTLI_QUALITY', 5)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if response.streaming:
+            return super().process_response(request, response)
+        if len(response.content) < self.min_bytes:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding == 'gzip':
+            return super().process_response(request, response)
+        if coding != 'br':
+            return response
+
+        compressed = brotli.compress(response.content, mode=brotli.MODE_TEXT, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,104 @@
+import csv
+import tempfile
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+
+# Rows fetched per round trip; on PostgreSQL iterator() reads through a server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+ENTRY_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'date'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('duration_minutes', 'duration_minutes'),
+    ('employee_id', 'employee_id'),
+    ('employee_username', 'employee__username'),
+    ('project_id', 'task__project_id'),
+    ('project_name', 'task__project__name'),
+    ('task_id', 'task_id'),
+    ('task_title_snapshot', 'task_title_snapshot'),
+    ('short_description', 'short_description'),
+    ('source', 'source'),
+    ('hourly_rate_toman', 'hourly_rate_toman'),
+    ('cost_toman', 'cost_toman'),
+)
+ENTRY_HEADER = [name for name, _ in ENTRY_COLUMNS]
+
+PAYROLL_HEADER = [
+    'employee_id', 'username', 'minutes', 'hourly_rate_toman', 'income_toman', 'paid_toman', 'outstanding_toman',
+]
+
+
+def entry_rows(queryset):
+    """Flat export rows of the given entries; every column is resolved in the one SQL query."""
+    lookups = [lookup for _, lookup in ENTRY_COLUMNS]
+    rows = queryset.order_by('date', 'start_time', 'id').values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    yield from rows
+
+
+def payroll_rows(summary):
+    for row in summary:
+        yield [row[key] for key in PAYROLL_HEADER]
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def xlsx_file(header, rows, title='Export'):
+    """Write rows into a spooled temporary XLSX file and return it rewound.
+
+    openpyxl's write-only mode keeps memory flat; the zip container still has to
+    be finished before the first byte can be sent.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+async def _aiterate(iterable, batch_size=500):
+    # Under ASGI a sync iterator would be drained into memory before sending;
+    # pull it in batches from the request's worker thread instead
+    iterator = iter(iterable)
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch_size)))
+    while batch := await next_batch():
+        for item in batch:
+            yield item
+
+
+def export_response(request, kind, header, rows, filename):
+    """CSV is streamed row by row; XLSX is built in a temporary file and then streamed."""
+    if kind == 'xlsx':
+        response = FileResponse(
+            xlsx_file(header, rows),
+            as_attachment=True,
+            filename=f'{filename}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    else:
+        response = StreamingHttpResponse(csv_lines(header, rows), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        response.streaming_content = _aiterate(response.streaming_content)
+    return response
@@ -0,0 +1,264 @@
+import csv
+import json
+from bisect import bisect_left
+from datetime import date, time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from . import metrics, rates, rollups
+from .models import Task, TimeEntry, entry_bounds
+from .report_cache import bump_table_version, bump_version
+from .serializers import OVERLAP_ERROR, overlap_guard
+
+IMPORT_CHUNK_SIZE = 5000
+# Errors kept in the report; the rest are only counted
+IMPORT_MAX_ERRORS = 1000
+
+Row = Tuple[int, Dict[str, Any]]
+
+
+def read_csv(stream) -> Iterator[Row]:
+    """(line number, row) pairs of a CSV text stream with a header line."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(stream) -> Iterator[Row]:
+    """(line number, row) pairs of a newline-delimited JSON text stream; blank lines are skipped."""
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else {'__invalid__': True}
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def _text(row, key) -> str:
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _int_or_none(value: str) -> Optional[int]:
+    return int(value) if value.isdigit() else None
+
+
+class _Importer:
+    def __init__(self, editor=None, dry_run=False):
+        self.editor = editor
+        self.dry_run = dry_run
+        # Resolved across chunks; bounded by the number of employees/tasks, not rows
+        self.employees_by_id: Dict[int, int] = {}
+        self.employees_by_name: Dict[str, int] = {}
+        self.tasks_by_id: Dict[int, Task] = {}
+        self.tasks_by_title: Dict[Tuple[str, str], List[Task]] = {}
+
+    def _resolve_employees(self, keys) -> None:
+        ids = {int(k) for k in keys if k.isdigit()} - set(self.employees_by_id)
+        names = {k for k in keys if not k.isdigit()} - set(self.employees_by_name)
+        if not ids and not names:
+            return
+        User = get_user_model()
+        for pk, username in User.objects.filter(Q(pk__in=ids) | Q(username__in=names)).values_list('pk', 'username'):
+            self.employees_by_id[pk] = pk
+            self.employees_by_name[username] = pk
+
+    def _employee(self, key: str) -> Optional[int]:
+        if key.isdigit():
+            return self.employees_by_id.get(int(key))
+        return self.employees_by_name.get(key)
+
+    def _resolve_tasks(self, ids, titles) -> None:
+        ids = set(ids) - set(self.tasks_by_id)
+        if ids:
+            self.tasks_by_id.update(Task.objects.select_related('project').in_bulk(ids))
+        titles = set(titles) - set(self.tasks_by_title)
+        if titles:
+            for key in titles:
+                self.tasks_by_title[key] = []
+            candidates = Task.objects.select_related('project').filter(
+                project__name__in={p for p, _ in titles}, title__in={t for _, t in titles}, is_deleted=False,
+            ).order_by('id')
+            for task in candidates:
+                key = (task.project.name, task.title)
+                if key in self.tasks_by_title:
+                    self.tasks_by_title[key].append(task)
+
+    def _parse(self, line_no, row, errors):
+        if row.get('__invalid__'):
+            errors.append((line_no, {api_settings.NON_FIELD_ERRORS_KEY: ['Expected a JSON object.']}))
+            return None
+        problems: Dict[str, str] = {}
+        parsed: Dict[str, Any] = {'line': line_no}
+
+        employee_id = self._employee(_text(row, 'employee'))
+        if employee_id is None:
+            problems['employee'] = 'Unknown employee.'
+        parsed['employee_id'] = employee_id
+
+        try:
+            parsed['date'] = date.fromisoformat(_text(row, 'date'))
+        except ValueError:
+            problems['date'] = 'Expected YYYY-MM-DD.'
+        for field in ('start_time', 'end_time'):
+            try:
+                parsed[field] = time.fromisoformat(_text(row, field))
+            except ValueError:
+                problems[field] = 'Expected HH:MM[:SS].'
+
+        task = None
+        task_id = _text(row, 'task')
+        project_name, task_title = _text(row, 'project'), _text(row, 'task_title')
+        if task_id:
+            task = self.tasks_by_id.get(_int_or_none(task_id))
+            if task is None:
+                problems['task'] = 'Unknown task.'
+        elif project_name:
+            matches = self.tasks_by_title.get((project_name, task_title), [])
+            if not matches:
+                problems['task'] = 'No task with this title in this project.'
+            elif len(matches) > 1:
+                problems['task'] = 'Task title is ambiguous in this project; use the task id.'
+            else:
+                task = matches[0]
+        if task is not None:
+            if task.is_deleted:
+                problems['task'] = 'Task is deleted'
+            elif task.project and task.project.is_deleted:
+                problems['task'] = 'Project is archived'
+        parsed['task'] = task
+        parsed['task_title_snapshot'] = task.title if task else task_title
+        if len(parsed['task_title_snapshot']) > 150:
+            problems['task_title'] = 'Ensure this field has no more than 150 characters.'
+
+        description = _text(row, 'short_description')
+        if len(description) > 300:
+            problems['short_description'] = 'Ensure this field has no more than 300 characters.'
+        parsed['short_description'] = description or None
+
+        if 'start_time' in parsed and 'end_time' in parsed and 'date' in parsed:
+            if parsed['start_time'] == parsed['end_time']:
+                problems['end_time'] = 'end_time must be after start_time'
+            else:
+                parsed['start_at'], parsed['end_at'] = entry_bounds(parsed['date'], parsed['start_time'], parsed['end_time'])
+                parsed['duration_minutes'] = int((parsed['end_at'] - parsed['start_at']).total_seconds() // 60)
+                given = _text(row, 'duration_minutes')
+                if given and _int_or_none(given) != parsed['duration_minutes']:
+                    problems['duration_minutes'] = f"Does not match start/end ({parsed['duration_minutes']} minutes)."
+
+        if problems:
+            errors.append((line_no, {field: [message] for field, message in problems.items()}))
+            return None
+        return parsed
+
+    def _reject_overlaps(self, parsed: List[Dict[str, Any]], errors) -> List[Dict[str, Any]]:
+        by_employee: Dict[int, List[Dict[str, Any]]] = {}
+        for item in parsed:
+            by_employee.setdefault(item['employee_id'], []).append(item)
+        accepted = []
+        for employee_id, items in by_employee.items():
+            items.sort(key=lambda item: item['start_at'])
+            # Stored entries never overlap each other, so sorted by start they are sorted by end too
+            stored = list(
+                TimeEntry.objects.filter(
+                    employee_id=employee_id,
+                    is_deleted=False,
+                    start_at__lt=max(item['end_at'] for item in items),
+                    end_at__gt=items[0]['start_at'],
+                ).order_by('start_at').values_list('start_at', 'end_at')
+            )
+            stored_starts = [start for start, _ in stored]
+            accepted_end = None
+            for item in items:
+                start_at, end_at = item['start_at'], item['end_at']
+                pos = bisect_left(stored_starts, end_at)
+                clashes_stored = pos > 0 and stored[pos - 1][1] > start_at
+                clashes_batch = accepted_end is not None and start_at < accepted_end
+                if clashes_stored or clashes_batch:
+                    metrics.overlap_rejected('import')
+                    errors.append((item['line'], {api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]}))
+                    continue
+                accepted_end = end_at
+                accepted.append(item)
+        return accepted
+
+    def run_chunk(self, chunk: List[Row]) -> Tuple[int, int, List[Tuple[int, Dict]]]:
+        """(valid rows, inserted rows, errors) of one chunk."""
+        errors: List[Tuple[int, Dict]] = []
+        self._resolve_employees({_text(row, 'employee') for _, row in chunk})
+        self._resolve_tasks(
+            {_int_or_none(_text(row, 'task')) for _, row in chunk if _text(row, 'task')} - {None},
+            {(_text(row, 'project'), _text(row, 'task_title')) for _, row in chunk if not _text(row, 'task') and _text(row, 'project')},
+        )
+        parsed = [item for item in (self._parse(line_no, row, errors) for line_no, row in chunk) if item]
+        valid = self._reject_overlaps(parsed, errors)
+        if self.dry_run or not valid:
+            return len(valid), 0, errors
+
+        entries = [
+            TimeEntry(
+                employee_id=item['employee_id'], task=item['task'], task_title_snapshot=item['task_title_snapshot'],
+                date=item['date'], start_time=item['start_time'], end_time=item['end_time'],
+                duration_minutes=item['duration_minutes'], start_at=item['start_at'], end_at=item['end_at'],
+                short_description=item['short_description'], source=TimeEntry.TimeEntrySource.IMPORT,
+                edited_by=self.editor,
+            )
+            for item in valid
+        ]
+        rates.price(entries)
+        try:
+            with overlap_guard():
+                TimeEntry.objects.bulk_create(entries, batch_size=1000)
+                rollups.append_many(entries)
+                metrics.entries_created(entries)
+                for employee_id in {entry.employee_id for entry in entries}:
+                    bump_version(employee_id)
+                bump_table_version(TimeEntry)
+        except serializers.ValidationError:
+            # A concurrent write won the race on PostgreSQL; the chunk is rolled back as a whole
+            for item in valid:
+                errors.append((item['line'], {api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]}))
+            return len(valid), 0, errors
+        return len(valid), len(entries), errors
+
+
+def import_entries(
+    rows: Iterable[Row],
+    editor=None,
+    dry_run: bool = False,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    max_errors: int = IMPORT_MAX_ERRORS,
+) -> Dict[str, Any]:
+    """Validate and insert rows chunk by chunk; returns counts and per-line errors.
+
+    Each chunk resolves employees and tasks with a few set-based queries, checks
+    overlaps within itself and against stored entries, and is inserted with
+    bulk_create in its own transaction. Rejected rows never stop the import.
+    A dry run validates every chunk against the database but inserts nothing, so
+    overlaps between rows of different chunks are only caught by a real run.
+    """
+    importer = _Importer(editor=editor, dry_run=dry_run)
+    report = {'rows': 0, 'valid': 0, 'created': 0, 'error_count': 0, 'errors': []}
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        valid, created, errors = importer.run_chunk(chunk)
+        report['rows'] += len(chunk)
+        report['valid'] += valid
+        report['created'] += created
+        report['error_count'] += len(errors)
+        room = max_errors - len(report['errors'])
+        report['errors'].extend({'line': line_no, 'errors': detail} for line_no, detail in sorted(errors, key=lambda e: e[0])[:room])
+    return report
@@ -0,0 +1,225 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger('tracker.requests')
+
+# Buckets of /api/metrics/; each bound is also a bound of the histograms in tracker.metrics
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class QueryRecorder:
+    """Query count, time and per-statement repeats of one request."""
+    __slots__ = ('count', 'seconds', 'repeats')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.repeats: Dict[str, int] = {}
+
+    def worst_repeat(self):
+        """(sql, times) of the most repeated statement, or None."""
+        if not self.repeats:
+            return None
+        sql = max(self.repeats, key=self.repeats.get)
+        return sql, self.repeats[sql]
+
+
+# Set for the duration of a request; sync_to_async copies the context, so ORM
+# work in worker threads of async views records into the same recorder
+_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar('tracker_query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.seconds += time.perf_counter() - started
+        recorder.count += 1
+        # Parameters are bound separately, so the SQL is already the template
+        recorder.repeats[sql] = recorder.repeats.get(sql, 0) + 1
+
+
+def install(connection) -> None:
+    """Record the queries of `connection`; called for every new database connection."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+class RouteStats:
+    """Aggregates of one route, read back from the request metrics: counts, totals and bucketed latency/query counts."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.bytes = 0
+        self.n_plus_one = 0
+        # Cumulative counts by upper bound, as Prometheus keeps them
+        self.latency: Dict[float, float] = {}
+        self.query_counts: Dict[float, float] = {}
+
+    def add(self, sample) -> None:
+        name, labels, value = sample.name, sample.labels, sample.value
+        if name == 'tracker_request_duration_seconds_count':
+            self.requests += int(value)
+            if labels.get('status') == '5xx':
+                self.errors += int(value)
+        elif name == 'tracker_request_duration_seconds_sum':
+            self.seconds += value
+        elif name == 'tracker_request_duration_seconds_bucket':
+            bound = round(float(labels['le']) * 1000, 3)
+            self.latency[bound] = self.latency.get(bound, 0) + value
+        elif name == 'tracker_request_queries_sum':
+            self.queries += int(value)
+        elif name == 'tracker_request_queries_bucket':
+            bound = float(labels['le'])
+            self.query_counts[bound] = self.query_counts.get(bound, 0) + value
+        elif name == 'tracker_request_db_seconds_total':
+            self.db_seconds += value
+        elif name == 'tracker_response_bytes_total':
+            self.bytes += int(value)
+        elif name == 'tracker_n_plus_one_requests_total':
+            self.n_plus_one += int(value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        # Requests per bucket (not cumulative): le_10 counts those above the previous bound up to 10
+        def buckets(bounds, cumulative):
+            counts, below = {}, 0
+            for bound in bounds:
+                at = int(cumulative.get(bound, 0))
+                counts[f'le_{bound}'] = at - below
+                below = at
+            counts['inf'] = self.requests - below
+            return counts
+
+        n = self.requests or 1
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_ms': round(self.seconds / n * 1000, 2),
+            'avg_queries': round(self.queries / n, 2),
+            'avg_db_ms': round(self.db_seconds / n * 1000, 2),
+            'avg_bytes': round(self.bytes / n),
+            'n_plus_one': self.n_plus_one,
+            'latency_ms': buckets(LATENCY_BUCKETS_MS, self.latency),
+            'queries': buckets(QUERY_BUCKETS, self.query_counts),
+        }
+
+
+def snapshot() -> Dict[str, Any]:
+    """Per-route aggregates since the workers started.
+
+    In multiprocess mode (PROMETHEUS_MULTIPROC_DIR) they are summed over all
+    worker processes, like /metrics; otherwise they cover this process only.
+    """
+    routes: Dict[str, RouteStats] = {}
+    for family in metrics.collect():
+        for sample in family.samples:
+            route = sample.labels.get('route')
+            if route is not None:
+                routes.setdefault(route, RouteStats()).add(sample)
+    return {
+        'scope': 'all workers' if metrics.multiprocess_mode() else 'this process',
+        'pid': os.getpid(),
+        'routes': {route: stats.as_dict() for route, stats in sorted(routes.items()) if stats.requests},
+    }
+
+
+def _route(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method} {match.view_name if match else 'unresolved'}"
+
+
+def _size(response) -> Optional[int]:
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Time each request and count its queries.
+
+    Adds a Server-Timing header, logs one key=value line per request on
+    `tracker.requests` (a warning when a statement repeats at least
+    REQUEST_METRICS_N_PLUS_ONE times, the usual sign of an N+1 loop), and
+    feeds the in-flight gauge and the per-route request metrics that /metrics
+    and /api/metrics/ read. Queries run while a streaming
+    response is consumed are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.n_plus_one = getattr(settings, 'REQUEST_METRICS_N_PLUS_ONE', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            with metrics.REQUESTS_IN_FLIGHT.track_inprogress():
+                response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self._finish(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            with metrics.REQUESTS_IN_FLIGHT.track_inprogress():
+                response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self._finish(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def _finish(self, request, response, recorder, seconds) -> None:
+        route = _route(request)
+        size = _size(response)
+        repeat = recorder.worst_repeat()
+        suspect = repeat is not None and repeat[1] >= self.n_plus_one
+        metrics.REQUEST_DURATION.labels(route, f'{response.status_code // 100}xx').observe(seconds)
+        metrics.REQUEST_QUERIES.labels(route).observe(recorder.count)
+        metrics.REQUEST_DB_SECONDS.labels(route).inc(recorder.seconds)
+        metrics.RESPONSE_BYTES.labels(route).inc(size or 0)
+        if suspect:
+            metrics.N_PLUS_ONE.labels(route).inc()
+
+        response['Server-Timing'] = (
+            f'app;dur={seconds * 1000:.1f}, '
+            f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries"'
+        )
+        if not (suspect or logger.isEnabledFor(logging.INFO)):
+            return
+        line = (
+            f'route="{route}" path="{request.path}" status={response.status_code} ms={seconds * 1000:.1f} '
+            f'queries={recorder.count} db_ms={recorder.seconds * 1000:.1f} bytes={size if size is not None else "-"}'
+        )
+        if suspect:
+            logger.warning('%s n_plus_one=%d sql="%s"', line, repeat[1], repeat[0][:300])
+        else:
+            logger.info(line)
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import MonthlyLedger, Settlement, TimeEntry
+from .report_cache import bump_version
+
+# (employee_id, year, month)
+LedgerKey = Tuple[int, int, int]
+
+
+def add_work(deltas: Dict[LedgerKey, Tuple[int, int]]) -> None:
+    """Add (minutes, cost) deltas to the ledgers of the given employee months."""
+    for (employee_id, year, month), (minutes, cost) in deltas.items():
+        if not (minutes or cost):
+            continue
+        lookup = {'employee_id': employee_id, 'year': year, 'month': month}
+        change = {'minutes': F('minutes') + minutes, 'earned_toman': F('earned_toman') + cost}
+        if MonthlyLedger.objects.filter(**lookup).update(**change):
+            continue
+        # get_or_create survives a concurrent insert of the same row
+        _, created = MonthlyLedger.objects.get_or_create(**lookup, defaults={'minutes': minutes, 'earned_toman': cost})
+        if not created:
+            MonthlyLedger.objects.filter(**lookup).update(**change)
+
+
+def locked(employee_id: int, year: int, month: int) -> MonthlyLedger:
+    """The ledger of an employee month, created if missing and locked until the transaction ends.
+
+    Settling takes this lock first, so a second settle of the same month waits
+    and then sees the first one's payment.
+    """
+    MonthlyLedger.objects.get_or_create(employee_id=employee_id, year=year, month=month)
+    return MonthlyLedger.objects.select_for_update().get(employee_id=employee_id, year=year, month=month)
+
+
+def add_paid(ledger: MonthlyLedger, amount_toman: int) -> None:
+    ledger.paid_toman = F('paid_toman') + amount_toman
+    ledger.save(update_fields=['paid_toman', 'updated_at'])
+
+
+def expected(employee_ids: Optional[Iterable[int]] = None) -> Dict[LedgerKey, Tuple[int, int, int]]:
+    """(minutes, earned, paid) per employee month, computed from live entries and settlements."""
+    entries = TimeEntry.objects.filter(is_deleted=False)
+    settlements = Settlement.objects.all()
+    if employee_ids is not None:
+        entries = entries.filter(employee_id__in=employee_ids)
+        settlements = settlements.filter(employee_id__in=employee_ids)
+    totals: Dict[LedgerKey, List[int]] = defaultdict(lambda: [0, 0, 0])
+    work = (
+        entries.values('employee_id', 'date__year', 'date__month')
+        .annotate(total=Sum('duration_minutes'), cost=Sum('cost_toman'))
+        .order_by()
+    )
+    for row in work:
+        total = totals[(row['employee_id'], row['date__year'], row['date__month'])]
+        total[0], total[1] = row['total'] or 0, row['cost'] or 0
+    paid = settlements.values('employee_id', 'year', 'month').annotate(total=Sum('amount_toman')).order_by()
+    for row in paid:
+        totals[(row['employee_id'], row['year'], row['month'])][2] = row['total'] or 0
+    return {key: tuple(total) for key, total in totals.items()}
+
+
+def reconcile(employee_ids: Optional[Iterable[int]] = None, fix: bool = True) -> List[dict]:
+    """Compare ledgers with entries and settlements; returns the drifted rows and rewrites them when fix is set."""
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+    with transaction.atomic():
+        rows = MonthlyLedger.objects.select_for_update()
+        if employee_ids is not None:
+            rows = rows.filter(employee_id__in=employee_ids)
+        stored = {(r.employee_id, r.year, r.month): r for r in rows}
+        wanted = expected(employee_ids)
+        drift, changed, missing = [], [], []
+        for key in sorted(set(stored) | set(wanted)):
+            minutes, earned, paid = wanted.get(key, (0, 0, 0))
+            row = stored.get(key)
+            have = (row.minutes, row.earned_toman, row.paid_toman) if row else (0, 0, 0)
+            if have == (minutes, earned, paid):
+                continue
+            employee_id, year, month = key
+            drift.append({
+                'employee_id': employee_id, 'year': year, 'month': month,
+                'minutes': have[0], 'expected_minutes': minutes,
+                'earned_toman': have[1], 'expected_earned_toman': earned,
+                'paid_toman': have[2], 'expected_paid_toman': paid,
+            })
+            if row is None:
+                missing.append(MonthlyLedger(
+                    employee_id=employee_id, year=year, month=month, minutes=minutes, earned_toman=earned, paid_toman=paid,
+                ))
+            else:
+                row.minutes, row.earned_toman, row.paid_toman = minutes, earned, paid
+                changed.append(row)
+        if fix:
+            MonthlyLedger.objects.bulk_create(missing, batch_size=1000)
+            MonthlyLedger.objects.bulk_update(changed, ['minutes', 'earned_toman', 'paid_toman'], batch_size=1000)
+            for employee_id in {row['employee_id'] for row in drift}:
+                bump_version(employee_id)
+    return drift
@@ -0,0 +1,65 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from tracker.models import Project, ProjectMembership, Task
+from tracker.views import TimeEntryViewSet
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Count the SQL statements issued per time entry create, update and delete. Changes are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-sql', action='store_true', help='Print every captured statement.')
+
+    def handle(self, *args, **options):
+        self.verbose_sql = options['verbose_sql']
+        try:
+            with transaction.atomic():
+                self._run()
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _measure(self, label, view, request, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            # TimeEntryViewSet is async since its reads moved to tracker.viewsets
+            response = async_to_sync(view)(request, **kwargs) if iscoroutinefunction(view) else view(request, **kwargs)
+        statements = [q['sql'] for q in ctx.captured_queries if not q['sql'].upper().startswith(('SAVEPOINT', 'RELEASE'))]
+        self.stdout.write(f'{label:<8} status={response.status_code} queries={len(statements)}')
+        if self.verbose_sql:
+            for sql in statements:
+                self.stdout.write(f'    {sql}')
+        return response
+
+    def _run(self):
+        admin = User.objects.create(username='__bench_admin__', is_staff=True)
+        employee = User.objects.create(username='__bench_employee__')
+        project = Project.objects.create(name='__bench__', created_by=admin)
+        task = Task.objects.create(title='__bench__', project=project, created_by=admin)
+        ProjectMembership.objects.create(project=project, user=employee, added_by=admin)
+        today = timezone.localdate().isoformat()
+        factory = APIRequestFactory()
+
+        request = factory.post('/api/time-entries/', {'task': task.id, 'date': today, 'start_time': '09:00', 'end_time': '10:00'}, format='json')
+        force_authenticate(request, user=employee)
+        response = self._measure('create', TimeEntryViewSet.as_view({'post': 'create'}), request)
+        pk = response.data['id']
+
+        request = factory.patch(f'/api/time-entries/{pk}/', {'end_time': '10:30'}, format='json')
+        force_authenticate(request, user=employee)
+        self._measure('update', TimeEntryViewSet.as_view({'patch': 'partial_update'}), request, pk=pk)
+
+        request = factory.delete(f'/api/time-entries/{pk}/')
+        force_authenticate(request, user=employee)
+        self._measure('delete', TimeEntryViewSet.as_view({'delete': 'destroy'}), request, pk=pk)
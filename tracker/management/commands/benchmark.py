@@ -0,0 +1,283 @@
+import json
+import time
+from datetime import time as day_time, timedelta
+from itertools import count
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from tracker import reporting
+from tracker.benchmarks import (
+    admin_screens, compare, employee_screen, entry_slot, large_payloads, save_baseline, seed, summarize,
+)
+from tracker.models import Project, ProjectMembership, Settlement, Task, TimeEntry
+from tracker.renderers import FastJSONRenderer
+from tracker.serializers import (
+    EmployeeSerializer, MembershipSerializer, ProjectSerializer, SettlementSerializer, TaskSerializer, TimeEntrySerializer,
+)
+from tracker.views import EmployeeViewSet
+
+PAGE_SIZE = 50
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Seed data in a rolled-back transaction and time every reporting function, the serializers, the JSON '
+            'renderers and the requests behind the employee and admin screens in process. Reports p50/p95/p99 and '
+            'queries per call, and the bytes on the wire of the biggest responses per encoding; '
+            '--save writes a JSON baseline and --compare fails on regressions against one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=40)
+        parser.add_argument('--projects', type=int, default=8)
+        parser.add_argument('--tasks', type=int, default=10, help='Tasks per project.')
+        parser.add_argument('--years', type=float, default=0.5, help='Years of history per employee.')
+        parser.add_argument('--entries-per-day', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=30, help='Timed runs per case, after one warm-up run.')
+        parser.add_argument('--only', help='Only run cases whose name contains this text.')
+        parser.add_argument('--save', metavar='PATH', help='Write the results as a JSON baseline.')
+        parser.add_argument('--compare', metavar='PATH', help='Fail if a case regressed against this baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth against the baseline (0.25 = 25%%).')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.results = {}
+        self.wire = {}
+        try:
+            with transaction.atomic():
+                self.data = seed(
+                    employees=options['employees'],
+                    projects=options['projects'],
+                    tasks_per_project=options['tasks'],
+                    days=round(options['years'] * 365),
+                    entries_per_day=options['entries_per_day'],
+                    prefix='__benchmark',
+                    skip_recent_days=2,
+                )
+                for name, run in self._cases():
+                    if not options['only'] or options['only'] in name:
+                        self.results[name] = self._measure(run)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        for label, sizes in self.wire.items():
+            for encoding, size in sizes.items():
+                if f'GET {label} ({encoding})' in self.results:
+                    self.results[f'GET {label} ({encoding})']['bytes'] = size
+        if options['json']:
+            self.stdout.write(json.dumps(self.results, indent=2))
+        else:
+            width = max(len(name) for name in self.results) if self.results else 0
+            self.stdout.write(f"{'case':<{width}} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}")
+            for name, row in self.results.items():
+                self.stdout.write(f"{name:<{width}} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['queries']:>8}")
+            self.stdout.write('(latencies in ms)')
+            wire = {
+                label: sizes for label, sizes in self.wire.items()
+                if any(f'{kind} {label} (' in name for kind in ('render', 'GET') for name in self.results)
+            }
+            if wire:
+                self.stdout.write('')
+                width = max(len(name) for name in wire)
+                self.stdout.write(f"{'response':<{width}} " + ' '.join(f'{e:>9}' for e in ENCODINGS))
+                for name, sizes in wire.items():
+                    self.stdout.write(f'{name:<{width}} ' + ' '.join(f'{sizes[e]:>9}' for e in ENCODINGS))
+                self.stdout.write('(bytes on the wire)')
+        if options['save']:
+            save_baseline(options['save'], self.results)
+            self.stdout.write(f"Baseline written to {options['save']}.")
+        if options['compare']:
+            regressions = compare(options['compare'], self.results, options['tolerance'])
+            for line in regressions:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["compare"]}.')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
+
+    def _measure(self, run):
+        run()
+        samples = []
+        for _ in range(self.options['repeat']):
+            started = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - started)
+        # Counted on a separate run so capturing SQL does not skew the timings
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+        queries = [q for q in ctx.captured_queries if not q['sql'].upper().startswith(('SAVEPOINT', 'RELEASE'))]
+        return summarize(samples, queries=len(queries))
+
+    def _cases(self):
+        yield from self._reporting_cases()
+        yield from self._serializer_cases()
+        yield from self._payload_cases()
+        yield from self._request_cases()
+
+    def _reporting_cases(self):
+        employee_id = self.data['employees'][0].id
+        project_id = self.data['projects'][0].id
+        # Latest seeded day, so the month always has entries
+        day = self.data['today'] - timedelta(days=2)
+        year, month = day.year, day.month
+        return [
+            ('reporting.daily_totals (30d)', lambda: reporting.daily_totals(employee_id, day - timedelta(days=29), day)),
+            ('reporting.weekly_totals (90d)', lambda: reporting.weekly_totals(employee_id, day - timedelta(days=89), day)),
+            ('reporting.monthly_totals (1y)', lambda: reporting.monthly_totals(employee_id, day - timedelta(days=364), day)),
+            ('reporting.monthly_task_pie', lambda: reporting.monthly_task_pie(employee_id, year, month)),
+            ('reporting.dashboard', lambda: reporting.dashboard(employee_id, day - timedelta(days=6), day, year, month)),
+            ('reporting.task_breakdown (30d)', lambda: reporting.task_breakdown(employee_id, day - timedelta(days=29), day)),
+            ('reporting.income_toman', lambda: reporting.income_toman(12_345, 250_000)),
+            ('reporting.employee_income', lambda: reporting.employee_income(employee_id, year, month)),
+            ('reporting.employees_income', lambda: reporting.employees_income(year, month)),
+            ('reporting.project_spend', lambda: reporting.project_spend(project_id, year, month)),
+            ('reporting.projects_budget', lambda: reporting.projects_budget(year, month)),
+        ]
+
+    def _request(self, method, user, data=None):
+        factory = APIRequestFactory()
+        request = Request(getattr(factory, method)('/', data, format='json', HTTP_HOST=self._host()))
+        request.user = user
+        return request
+
+    def _hot_lists(self, employee):
+        """(label, serializer, queryset) of the lists rendered from values(), in their list endpoint's order."""
+        return [
+            ('TimeEntrySerializer', TimeEntrySerializer, TimeEntry.objects.filter(employee=employee, is_deleted=False)
+                .select_related('task', 'task__project', 'employee').order_by('-date', '-start_time', '-id')),
+            ('TaskSerializer', TaskSerializer, Task.objects.order_by('-created_at', '-id')),
+            ('ProjectSerializer', ProjectSerializer, Project.objects.order_by('-created_at')),
+            ('MembershipSerializer', MembershipSerializer, ProjectMembership.objects.select_related('project', 'user').order_by('-created_at')),
+            ('SettlementSerializer', SettlementSerializer, Settlement.objects.select_related('employee').order_by('-settled_at', '-id')),
+        ]
+
+    def _check_values_output(self, employee, get):
+        # Golden check: the values() rendering must give byte-identical JSON, including
+        # entries without a task and tasks without a project (fields DRF leaves out)
+        loose = Task.objects.create(title='__benchmark_loose', created_by=self.data['admin'])
+        day = self.data['today'] - timedelta(days=5000)
+        for task, hour in ((None, 8), (loose, 10)):
+            TimeEntry.objects.create(
+                employee=employee, task=task, task_title_snapshot=task.title if task else '', date=day,
+                start_time=day_time(hour), end_time=day_time(hour + 1), duration_minutes=60,
+            )
+        renderer = JSONRenderer()
+        for label, serializer, queryset in self._hot_lists(employee):
+            for rows in (queryset[:500], queryset.reverse()[:PAGE_SIZE]):
+                expected = renderer.render(serializer(list(rows), many=True, context={'request': get}).data)
+                actual = renderer.render(serializer.represent_values(rows.values(*serializer.values_lookups())))
+                if actual != expected:
+                    raise CommandError(f'{label}: values() output differs from the serializer output.')
+
+    def _serializer_cases(self):
+        admin, employee = self.data['admin'], self.data['employees'][0]
+        get = self._request('get', admin)
+        employees = list(EmployeeViewSet.queryset.select_related('profile')[:PAGE_SIZE])
+        post = self._request('post', employee)
+        body = {'task': self.data['tasks'][0].id, **entry_slot(0, self.data['today'])}
+
+        def validate_entry():
+            serializer = TimeEntrySerializer(data=body, context={'request': post})
+            serializer.is_valid(raise_exception=True)
+
+        self._check_values_output(employee, get)
+        cases = [
+            ('TimeEntrySerializer validate', validate_entry),
+            (f'EmployeeSerializer ({PAGE_SIZE} rows)', lambda: EmployeeSerializer(employees, many=True).data),
+        ]
+        for label, serializer, queryset in self._hot_lists(employee):
+            instances = list(queryset[:PAGE_SIZE])
+            rows = list(queryset.values(*serializer.values_lookups())[:PAGE_SIZE])
+            cases += [
+                (f'{label} ({PAGE_SIZE} rows)', lambda s=serializer, i=instances: s(i, many=True, context={'request': get}).data),
+                (f'{label} values ({PAGE_SIZE} rows)', lambda s=serializer, r=rows: s.represent_values(r)),
+            ]
+        return cases
+
+    def _payload_cases(self):
+        # Render CPU of DRF's renderer against orjson's on the same data, and the
+        # size of each response uncompressed, gzipped and brotli-compressed
+        employee = self.data['employees'][0]
+        client = self._client(self.data['admin'])
+        drf, fast = JSONRenderer(), FastJSONRenderer()
+        cases = []
+        for label, path in large_payloads(employee.id, self.data['today']):
+            response = client.get(path, HTTP_ACCEPT_ENCODING='identity')
+            if response.status_code != 200:
+                raise CommandError(f'GET {path}: HTTP {response.status_code}')
+            data = response.data
+            if fast.render(data) != drf.render(data):
+                raise CommandError(f'{label}: FastJSONRenderer output differs from JSONRenderer.')
+            self.wire[label] = {
+                encoding: len(client.get(path, HTTP_ACCEPT_ENCODING=encoding).content) for encoding in ENCODINGS
+            }
+            cases += [
+                (f'render {label} (DRF)', lambda d=data: drf.render(d)),
+                (f'render {label} (orjson)', lambda d=data: fast.render(d)),
+            ]
+            cases += [(f'GET {label} ({encoding})', self._get(client, path, encoding)) for encoding in ENCODINGS]
+        return cases
+
+    def _host(self):
+        return settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+
+    def _client(self, user):
+        client = APIClient(HTTP_HOST=self._host())
+        client.force_authenticate(user=user)
+        return client
+
+    def _get(self, client, path, encoding='identity'):
+        def run():
+            response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+            if response.status_code != 200:
+                raise CommandError(f'GET {path}: HTTP {response.status_code}')
+        return run
+
+    def _revalidate(self, client, path):
+        # The first response's ETag, sent back as the SPA's HTTP cache would
+        etag = client.get(path).get('ETag')
+        if etag is None:
+            return None
+
+        def run():
+            response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+            if response.status_code != 304:
+                raise CommandError(f'GET {path} with If-None-Match: HTTP {response.status_code}')
+        return run
+
+    def _request_cases(self):
+        today = self.data['today']
+        employee = self.data['employees'][0]
+        employee_client, admin_client = self._client(employee), self._client(self.data['admin'])
+        task_id = self.data['tasks'][0].id
+        slots = count()
+
+        def log_time():
+            response = employee_client.post('/api/time-entries/', {'task': task_id, **entry_slot(next(slots), today)}, format='json')
+            if response.status_code != 201:
+                raise CommandError(f'POST /api/time-entries/: HTTP {response.status_code} {response.data}')
+
+        cases = [('employee: log time', log_time)]
+        cases += [(f'employee: {label}', self._get(employee_client, path)) for label, path in employee_screen(today)]
+        for screen, requests in admin_screens(employee.id, today).items():
+            cases += [(f'admin {screen}: {label}', self._get(admin_client, path)) for label, path in requests]
+        revalidations = [(f'employee: {label}', employee_client, path) for label, path in employee_screen(today)]
+        revalidations += [
+            (f'admin {screen}: {label}', admin_client, path)
+            for screen, requests in admin_screens(employee.id, today).items() for label, path in requests
+        ]
+        for name, client, path in revalidations:
+            run = self._revalidate(client, path)
+            if run is not None:
+                cases.append((f'{name} (304)', run))
+        return cases
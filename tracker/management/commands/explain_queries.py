@@ -0,0 +1,135 @@
+import re
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from tracker import sync
+from tracker.benchmarks import seed
+from tracker.reporting import dashboard, employee_income, employees_income, project_spend, projects_budget, task_breakdown
+from tracker.views import SettlementViewSet, TaskViewSet, TimeEntryViewSet, sync_changes
+
+# Tables large enough that a full scan on them is a regression
+WATCHED_TABLES = ('tracker_timeentry', 'tracker_dailyrollup', 'tracker_settlement', 'tracker_task', 'tracker_monthlyledger')
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Seed data in a rolled-back transaction, run the hot report and list queries, '
+            'EXPLAIN each one and fail if any of them does a full scan of a large table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=40)
+        parser.add_argument('--days', type=int, default=180)
+        parser.add_argument('--entries-per-day', type=int, default=4)
+        parser.add_argument('--show-plans', action='store_true', help='Print the plan of every query.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.failures = []
+        try:
+            with transaction.atomic():
+                self._seed()
+                self._check()
+                raise _Rollback
+        except _Rollback:
+            pass
+        if self.failures:
+            for label, table, sql in self.failures:
+                self.stderr.write(f'{label}: full scan of {table}\n    {sql}')
+            raise CommandError(f'{len(self.failures)} queries fall back to a full table scan.')
+        self.stdout.write(self.style.SUCCESS('All checked queries use an index.'))
+
+    def _seed(self):
+        data = seed(
+            employees=self.options['employees'],
+            days=self.options['days'],
+            entries_per_day=self.options['entries_per_day'],
+            prefix='__explain',
+        )
+        self.admin, self.employees, self.tasks, self.today = data['admin'], data['employees'], data['tasks'], data['today']
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _scenarios(self):
+        factory = APIRequestFactory()
+        employee = self.employees[0]
+        year, month = self.today.year, self.today.month
+        start = self.today - timedelta(days=6)
+        synced_at = timezone.now() - timedelta(hours=1)
+
+        def api(view, user, url):
+            def run():
+                request = factory.get(url, HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost')
+                force_authenticate(request, user=user)
+                # list views are async since they moved to tracker.viewsets
+                response = async_to_sync(view)(request) if iscoroutinefunction(view) else view(request)
+                response.render()
+                return response
+            return run
+
+        def next_page(view, user, url):
+            # Follows the first page's next link, so the keyset filter is explained too
+            def run():
+                api(view, user, api(view, user, url)().data['next'])()
+            return run
+
+        entries = TimeEntryViewSet.as_view({'get': 'list'})
+        return [
+            ('entries (employee)', api(entries, employee, '/api/time-entries/')),
+            ('entries (admin)', api(entries, self.admin, '/api/time-entries/')),
+            ('entries (admin, employee)', api(entries, self.admin, f'/api/time-entries/?employee={employee.id}')),
+            ('entries (admin, next page)', next_page(entries, self.admin, '/api/time-entries/')),
+            ('entries (admin, date range)', api(entries, self.admin, f'/api/time-entries/?date_from={start}&date_to={self.today}')),
+            ('tasks (project)', api(TaskViewSet.as_view({'get': 'list'}), self.admin, f'/api/tasks/?project={self.tasks[0].project_id}')),
+            ('settlements (employee)', api(SettlementViewSet.as_view({'get': 'list'}), self.admin, f'/api/settlements/?employee={employee.id}')),
+            ('sync (employee)', api(sync_changes, employee, f'/api/sync/?since={sync.cursor_at(employee, synced_at)}')),
+            ('sync (admin)', api(sync_changes, self.admin, f'/api/sync/?since={sync.cursor_at(self.admin, synced_at)}')),
+            ('dashboard', lambda: dashboard(employee.id, start, self.today, year, month)),
+            ('task breakdown', lambda: task_breakdown(employee.id, start, self.today)),
+            ('employee income', lambda: employee_income(employee.id, year, month)),
+            ('employees income', lambda: employees_income(year, month)),
+            ('project spend', lambda: project_spend(self.tasks[0].project_id, year, month)),
+            ('projects budget', lambda: projects_budget(year, month)),
+        ]
+
+    def _check(self):
+        for label, run in self._scenarios():
+            with CaptureQueriesContext(connection) as ctx:
+                run()
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan = self._explain(sql)
+                if self.options['show_plans']:
+                    self.stdout.write(f'{label}: {sql}\n' + '\n'.join(f'    {line}' for line in plan))
+                for table in self._full_scans(plan):
+                    if table in WATCHED_TABLES:
+                        self.failures.append((label, table, sql))
+            self.stdout.write(f'{label:<30} {len(ctx.captured_queries)} queries checked')
+
+    def _explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def _full_scans(self, plan):
+        pattern = SQLITE_FULL_SCAN if connection.vendor == 'sqlite' else POSTGRES_FULL_SCAN
+        for line in plan:
+            match = pattern.search(line.strip())
+            if match:
+                yield match.group(1)
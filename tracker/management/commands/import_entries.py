@@ -0,0 +1,43 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.imports import IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS, READERS, import_entries
+
+
+class Command(BaseCommand):
+    help = 'Import historical time entries from a CSV or NDJSON file, chunk by chunk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension (.ndjson/.jsonl or csv).')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--max-errors', type=int, default=IMPORT_MAX_ERRORS, help='Errors listed in the report.')
+        parser.add_argument('--editor', help='Username recorded as edited_by on the imported entries.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; nothing is written.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        kind = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        editor = None
+        if options['editor']:
+            try:
+                editor = get_user_model().objects.get(username=options['editor'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user {options['editor']!r}.")
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            report = import_entries(
+                READERS[kind](stream),
+                editor=editor,
+                dry_run=options['dry_run'],
+                chunk_size=options['chunk_size'],
+                max_errors=options['max_errors'],
+            )
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        verb = 'would be created' if options['dry_run'] else 'created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} rows read, {report['valid'] if options['dry_run'] else report['created']} {verb}, "
+            f"{report['error_count']} rejected."
+        ))
@@ -0,0 +1,198 @@
+import itertools
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracker.benchmarks import admin_screens, compare, employee_screen, entry_slot, save_baseline, summarize
+
+# Query count reported by tracker.instrumentation in the Server-Timing header
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+DEFAULT_PATHS = [
+    '/api/me/income/',
+    '/api/me/profile/',
+    '/api/time-entries/',
+    '/api/reports/income/',
+    '/api/reports/projects/budget/',
+]
+
+
+class Command(BaseCommand):
+    help = ('Drive a running server with concurrent requests and report throughput, p50/p95/p99 latency and '
+            'queries (from the Server-Timing header) per request. '
+            'By default every worker GETs --path in turn; --profile instead scripts employees logging time and '
+            'admins opening the dashboard, employees and settlements screens, against users made by seed_data. '
+            'Run it once against SERVER_MODE=wsgi and once against SERVER_MODE=asgi to compare.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--username', help='Obtain a JWT for this user (admin for the report paths).')
+        parser.add_argument('--password')
+        parser.add_argument('--token', help='Use this access token instead of logging in.')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Path to request (repeatable). Default: {", ".join(DEFAULT_PATHS)}')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--profile', action='store_true', help='Run the scripted employee/admin profile.')
+        parser.add_argument('--employees', type=int, default=18, help='Profile: virtual employees, logged in as <prefix>_0..N-1.')
+        parser.add_argument('--admins', type=int, default=2, help='Profile: virtual admins, logged in as <prefix>_admin.')
+        parser.add_argument('--prefix', default='bench', help='Profile: seed_data --prefix.')
+        parser.add_argument('--think', type=float, default=0.0, help='Profile: seconds each virtual user waits between requests.')
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds to run.')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON.')
+        parser.add_argument('--save', metavar='PATH', help='Write the per-request results as a JSON baseline.')
+        parser.add_argument('--compare', metavar='PATH', help='Fail if a request regressed against this baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth and throughput drop against the baseline.')
+
+    def handle(self, *args, **options):
+        self.base = options['base_url'].rstrip('/')
+        if options['profile']:
+            users = self._profile_users(options)
+        else:
+            token = options['token'] or self._login(options['username'], options['password'])
+            paths = options['paths'] or DEFAULT_PATHS
+            users = [(token, self._paths_script(paths, n)) for n in range(options['concurrency'])]
+        latencies = defaultdict(list)
+        failures = defaultdict(int)
+        queries = defaultdict(list)
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def worker(token, script):
+            for label, method, path, body in script:
+                if time.monotonic() >= deadline:
+                    break
+                started = time.perf_counter()
+                try:
+                    _, headers = self._open(method, path, token, body)
+                    ok = True
+                except (urllib.error.URLError, OSError):
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if ok:
+                        latencies[label].append(elapsed)
+                        match = SERVER_TIMING_QUERIES.search(headers.get('Server-Timing', ''))
+                        if match:
+                            queries[label].append(int(match.group(1)))
+                    else:
+                        failures[label] += 1
+                if options['think']:
+                    time.sleep(options['think'])
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker, args=user) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.monotonic() - started
+
+        summary = {'concurrency': len(users), 'seconds': round(wall, 2), 'paths': {}}
+        for label in sorted(set(latencies) | set(failures)):
+            samples, counts = latencies[label], queries[label]
+            summary['paths'][label] = summarize(
+                samples,
+                errors=failures[label],
+                rps=round(len(samples) / wall, 1),
+                queries=round(sum(counts) / len(counts), 1) if counts else None,
+            )
+        total = sum(len(v) for v in latencies.values())
+        summary['rps'] = round(total / wall, 1)
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+        else:
+            width = max((len(label) for label in summary['paths']), default=4)
+            self.stdout.write(f"{'path':<{width}} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+            for label, row in summary['paths'].items():
+                cells = [f"{row[k]:>8}" if row[k] is not None else f"{'-':>8}" for k in ('p50_ms', 'p95_ms', 'p99_ms', 'queries')]
+                self.stdout.write(f"{label:<{width}} {row['n']:>7} {row['errors']:>5} {row['rps']:>8} {' '.join(cells)}")
+            self.stdout.write(f"total {total} requests in {summary['seconds']}s, {summary['rps']} req/s (latencies in ms)")
+        results = {**summary['paths'], 'total': {'rps': summary['rps']}}
+        if options['save']:
+            save_baseline(options['save'], results)
+            self.stdout.write(f"Baseline written to {options['save']}.")
+        if options['compare']:
+            regressions = compare(options['compare'], results, options['tolerance'])
+            for line in regressions:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['compare']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
+
+    def _paths_script(self, paths, offset):
+        for i in itertools.count(offset):
+            path = paths[i % len(paths)]
+            yield path, 'GET', path, None
+
+    def _profile_users(self, options):
+        prefix, password, today = options['prefix'], options['password'] or 'bench', timezone.localdate()
+        admin_token = self._login(f'{prefix}_admin', password)
+        employee_ids = [row['id'] for row in self._get_all('/api/employees/?fields=id,username&page_size=500', admin_token)]
+        if not employee_ids:
+            raise CommandError('No employees; run seed_data first.')
+        users = []
+        for n in range(options['employees']):
+            token = self._login(f'{prefix}_{n}', password)
+            tasks = self._call('GET', '/api/tasks/?page_size=1', token)['results']
+            if not tasks:
+                raise CommandError(f'{prefix}_{n} sees no tasks; run seed_data first.')
+            # Continue after the slots earlier runs filled
+            _, entries_path = employee_screen(today)[1]
+            used = len(self._get_all(entries_path, token))
+            users.append((token, self._employee_script(today, tasks[0]['id'], used)))
+        for n in range(options['admins']):
+            users.append((admin_token, self._admin_script(today, employee_ids[n:] + employee_ids[:n])))
+        return users
+
+    def _employee_script(self, today, task_id, first_slot):
+        for slot in itertools.count(first_slot):
+            yield 'employee: log time', 'POST', '/api/time-entries/', {'task': task_id, **entry_slot(slot, today)}
+            for label, path in employee_screen(today):
+                yield f'employee: {label}', 'GET', path, None
+
+    def _admin_script(self, today, employee_ids):
+        for employee_id in itertools.cycle(employee_ids):
+            for screen, requests in admin_screens(employee_id, today).items():
+                for label, path in requests:
+                    yield f'admin {screen}: {label}', 'GET', path, None
+
+    def _open(self, method, path, token, body=None):
+        headers = {'Authorization': f'Bearer {token}'}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base + path, data=data, headers=headers, method=method)
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.read(), response.headers
+
+    def _call(self, method, path, token, body=None):
+        content, _ = self._open(method, path, token, body)
+        return json.loads(content) if content else None
+
+    def _get_all(self, path, token):
+        rows = []
+        url = self.base + path
+        while url:
+            page = self._call('GET', url[len(self.base):], token)
+            rows.extend(page['results'])
+            url = page['next']
+        return rows
+
+    def _login(self, username, password):
+        if not username:
+            raise CommandError('Pass --token or --username/--password.')
+        body = json.dumps({'username': username, 'password': password}).encode()
+        request = urllib.request.Request(self.base + '/api/auth/token/', data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.load(response)['access']
+        except urllib.error.HTTPError as exc:
+            raise CommandError(f'Login failed for {username}: HTTP {exc.code}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tracker.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily reporting rollup from time entries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', type=int, action='append', dest='employees',
+                            help='Only rebuild this employee id (repeatable).')
+
+    def handle(self, *args, **options):
+        written = rebuild(options['employees'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows.'))
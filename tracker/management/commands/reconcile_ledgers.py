@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.ledger import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute monthly ledgers from time entries and settlements, report drift and rewrite the drifted rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', type=int, action='append', dest='employees',
+                            help='Only reconcile this employee id (repeatable).')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift and exit with an error if there is any; nothing is rewritten.')
+
+    def handle(self, *args, **options):
+        drift = reconcile(options['employees'], fix=not options['check'])
+        for row in drift:
+            self.stderr.write(
+                f"employee {row['employee_id']} {row['year']}-{row['month']:02d}: "
+                f"minutes {row['minutes']} (expected {row['expected_minutes']}), "
+                f"earned {row['earned_toman']} (expected {row['expected_earned_toman']}), "
+                f"paid {row['paid_toman']} (expected {row['expected_paid_toman']})"
+            )
+        if options['check']:
+            if drift:
+                raise CommandError(f'{len(drift)} ledger rows drifted.')
+            self.stdout.write(self.style.SUCCESS('Ledgers match entries and settlements.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Rewrote {len(drift)} drifted ledger rows.'))
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tracker.benchmarks import seed
+
+
+class Command(BaseCommand):
+    help = ('Seed a benchmark data set: <prefix>_admin (staff) and <prefix>_0..N-1 employees who are members of '
+            'every project, with entries over the given number of years. Today and yesterday are left free so '
+            '`loadtest --profile` can log time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=20, help='Tasks per project.')
+        parser.add_argument('--years', type=float, default=1.0, help='Years of history per employee.')
+        parser.add_argument('--entries-per-day', type=int, default=4, help='One-hour entries from 08:00, two hours apart (at most 8).')
+        parser.add_argument('--prefix', default='bench', help='Username and project name prefix.')
+        parser.add_argument('--password', default='bench', help='Password of every seeded user.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if not 1 <= options['entries_per_day'] <= 8:
+            raise CommandError('--entries-per-day must be between 1 and 8.')
+        if get_user_model().objects.filter(username=f'{prefix}_admin').exists():
+            raise CommandError(f'{prefix}_admin already exists; pick another --prefix or use a fresh database.')
+        with transaction.atomic():
+            data = seed(
+                employees=options['employees'],
+                projects=options['projects'],
+                tasks_per_project=options['tasks'],
+                days=round(options['years'] * 365),
+                entries_per_day=options['entries_per_day'],
+                prefix=prefix,
+                password=options['password'],
+                skip_recent_days=2,
+            )
+        entries = len(data['employees']) * round(options['years'] * 365) * options['entries_per_day']
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(data['employees'])} employees, {len(data['projects'])} projects, "
+            f"{len(data['tasks'])} tasks and {entries} entries."
+        ))
@@ -0,0 +1,84 @@
+import os
+from collections import Counter as Tally
+from typing import Iterable
+
+from django.db import transaction
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+__all__ = ['CONTENT_TYPE_LATEST', 'entries_created', 'overlap_rejected', 'settlement_written', 'collect', 'exposition']
+
+# With PROMETHEUS_MULTIPROC_DIR set (docker-entrypoint.sh sets it), every worker
+# process writes its values to files in that directory and /metrics sums them.
+
+ENTRIES_CREATED = Counter('tracker_time_entries_created_total', 'Time entries created, by source.', ['source'])
+OVERLAP_REJECTIONS = Counter(
+    'tracker_overlap_rejections_total',
+    'Time entries rejected for overlapping another entry, by the check that caught them.',
+    ['check'],
+)
+SETTLEMENTS = Counter('tracker_settlements_total', 'Settlements written.')
+SETTLED_TOMAN = Counter('tracker_settled_toman_total', 'Amount settled, in toman.')
+REPORT_CACHE = Counter('tracker_report_cache_lookups_total', 'Report cache lookups, by result.', ['result'])
+REQUESTS_IN_FLIGHT = Gauge('tracker_requests_in_flight', 'Requests being served.', multiprocess_mode='livesum')
+REQUEST_DURATION = Histogram(
+    'tracker_request_duration_seconds',
+    'Request wall time, by route and status class.',
+    ['route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'tracker_request_queries',
+    'Database queries per request, by route.',
+    ['route'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_SECONDS = Counter('tracker_request_db_seconds_total', 'Time spent in database queries, by route.', ['route'])
+RESPONSE_BYTES = Counter('tracker_response_bytes_total', 'Response body bytes sent, by route.', ['route'])
+N_PLUS_ONE = Counter(
+    'tracker_n_plus_one_requests_total',
+    'Requests repeating one statement at least REQUEST_METRICS_N_PLUS_ONE times, by route.',
+    ['route'],
+)
+
+
+def entries_created(entries: Iterable) -> None:
+    """Count new entries by source once the surrounding transaction commits."""
+    by_source = Tally(entry.source for entry in entries)
+
+    def count():
+        for source, n in by_source.items():
+            ENTRIES_CREATED.labels(source).inc(n)
+    transaction.on_commit(count)
+
+
+def overlap_rejected(check: str, n: int = 1) -> None:
+    OVERLAP_REJECTIONS.labels(check).inc(n)
+
+
+def settlement_written(amount_toman: int) -> None:
+    def count():
+        SETTLEMENTS.inc()
+        SETTLED_TOMAN.inc(amount_toman)
+    transaction.on_commit(count)
+
+
+def multiprocess_mode() -> bool:
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def _registry():
+    if multiprocess_mode():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def collect():
+    """Metric families, summed over the worker processes in multiprocess mode."""
+    return _registry().collect()
+
+
+def exposition() -> bytes:
+    """Text exposition of all metrics, summed over the worker processes in multiprocess mode."""
+    return generate_latest(_registry())
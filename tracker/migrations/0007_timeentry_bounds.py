@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import make_aware
+
+
+def backfill_bounds(apps, schema_editor):
+    TimeEntry = apps.get_model('tracker', 'TimeEntry')
+    local_tz = ZoneInfo(settings.TIME_ZONE)
+    batch = []
+    for entry in TimeEntry.objects.only('date', 'start_time', 'end_time').iterator(chunk_size=2000):
+        end_date = entry.date
+        if entry.end_time <= entry.start_time:
+            end_date = entry.date + timedelta(days=1)
+        entry.start_at = make_aware(datetime.combine(entry.date, entry.start_time), local_tz)
+        entry.end_at = make_aware(datetime.combine(end_date, entry.end_time), local_tz)
+        batch.append(entry)
+        if len(batch) >= 2000:
+            TimeEntry.objects.bulk_update(batch, ['start_at', 'end_at'])
+            batch = []
+    if batch:
+        TimeEntry.objects.bulk_update(batch, ['start_at', 'end_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_timeentry_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='start_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='end_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_bounds, migrations.RunPython.noop),
+    ]
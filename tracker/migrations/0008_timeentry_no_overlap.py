@@ -0,0 +1,58 @@
+import logging
+
+from django.db import IntegrityError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+NO_OVERLAP_CONSTRAINT = 'tracker_timeentry_no_overlap'
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # PostgreSQL only: reject overlapping live entries of the same employee at
+    # the database level so concurrent writes cannot both pass validation
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                f'ALTER TABLE tracker_timeentry ADD CONSTRAINT {NO_OVERLAP_CONSTRAINT} '
+                "EXCLUDE USING gist (employee_id WITH =, tstzrange(start_at, end_at, '[)') WITH &&) "
+                'WHERE (NOT is_deleted)'
+            )
+    except IntegrityError:
+        logger.warning(
+            'Existing time entries overlap; skipped %s. Resolve the overlaps and re-run this migration.',
+            NO_OVERLAP_CONSTRAINT,
+        )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE tracker_timeentry DROP CONSTRAINT IF EXISTS {NO_OVERLAP_CONSTRAINT}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_timeentry_bounds'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeentry',
+            name='start_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='timeentry',
+            name='end_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['employee', 'start_at', 'end_at'], name='tracker_timeentry_span_idx'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.1 on 2026-10-17 20:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_rollups(apps, schema_editor):
+    TimeEntry = apps.get_model('tracker', 'TimeEntry')
+    DailyRollup = apps.get_model('tracker', 'DailyRollup')
+    grouped = (
+        TimeEntry.objects.filter(is_deleted=False)
+        .values('employee_id', 'date', 'task_id', 'task_title_snapshot', 'task__project_id')
+        .annotate(total_minutes=Sum('duration_minutes'))
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(
+                employee_id=row['employee_id'],
+                date=row['date'],
+                task_id=row['task_id'],
+                task_title_snapshot=row['task_title_snapshot'],
+                project_id=row['task__project_id'],
+                minutes=row['total_minutes'] or 0,
+            )
+            for row in grouped.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_timeentry_no_overlap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeentry',
+            name='source',
+            field=models.CharField(choices=[('manual', 'Manual'), ('timer', 'Timer')], default='manual', max_length=16),
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('task_title_snapshot', models.CharField(max_length=150)),
+                ('minutes', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tracker.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tracker.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'date'], name='tracker_dai_employe_933601_idx')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
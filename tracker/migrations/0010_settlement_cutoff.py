@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-17 20:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_visible_since(apps, schema_editor):
+    Settlement = apps.get_model('tracker', 'Settlement')
+    EmployeeProfile = apps.get_model('tracker', 'EmployeeProfile')
+    latest = Settlement.objects.values('employee_id').annotate(last=Max('settled_at')).order_by()
+    for row in latest:
+        EmployeeProfile.objects.update_or_create(user_id=row['employee_id'], defaults={'visible_since': row['last']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_dailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='visible_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_visible_since, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['employee', 'created_at'], name='tracker_tim_employe_894c62_idx'),
+        ),
+    ]
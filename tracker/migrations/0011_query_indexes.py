@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-17 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_settlement_cutoff'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['employee', 'year', 'month'], name='tracker_settle_emp_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['year', 'month'], name='tracker_settle_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'created_at'], name='tracker_task_project_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['employee', 'date', 'start_time'], name='tracker_te_live_emp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date', 'start_time'], name='tracker_te_live_date_idx'),
+        ),
+    ]
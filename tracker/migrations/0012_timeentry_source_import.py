@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeentry',
+            name='source',
+            field=models.CharField(choices=[('manual', 'Manual'), ('timer', 'Timer'), ('import', 'Import')], default='manual', max_length=16),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-17 20:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_ledgers(apps, schema_editor):
+    TimeEntry = apps.get_model('tracker', 'TimeEntry')
+    Settlement = apps.get_model('tracker', 'Settlement')
+    MonthlyLedger = apps.get_model('tracker', 'MonthlyLedger')
+    totals = {}
+    minutes = (
+        TimeEntry.objects.filter(is_deleted=False)
+        .values('employee_id', 'date__year', 'date__month')
+        .annotate(total=Sum('duration_minutes'))
+        .order_by()
+    )
+    for row in minutes:
+        totals.setdefault((row['employee_id'], row['date__year'], row['date__month']), [0, 0])[0] = row['total'] or 0
+    paid = Settlement.objects.values('employee_id', 'year', 'month').annotate(total=Sum('amount_toman')).order_by()
+    for row in paid:
+        totals.setdefault((row['employee_id'], row['year'], row['month']), [0, 0])[1] = row['total'] or 0
+    MonthlyLedger.objects.bulk_create(
+        (
+            MonthlyLedger(employee_id=employee_id, year=year, month=month, minutes=m, paid_toman=p)
+            for (employee_id, year, month), (m, p) in totals.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_timeentry_source_import'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('minutes', models.IntegerField(default=0)),
+                ('paid_toman', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledgers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='tracker_ledger_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'year', 'month'), name='tracker_ledger_emp_period_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_ledgers, migrations.RunPython.noop),
+    ]
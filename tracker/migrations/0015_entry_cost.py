@@ -0,0 +1,115 @@
+# Generated by Django 5.1.1 on 2026-10-17 21:12
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_costs(apps, schema_editor):
+    # Today's rate becomes each employee's first rate, effective from
+    # rates.FIRST_DAY; entries, rollups and ledgers are priced at it
+    EmployeeProfile = apps.get_model('tracker', 'EmployeeProfile')
+    HourlyRate = apps.get_model('tracker', 'HourlyRate')
+    TimeEntry = apps.get_model('tracker', 'TimeEntry')
+    DailyRollup = apps.get_model('tracker', 'DailyRollup')
+    MonthlyLedger = apps.get_model('tracker', 'MonthlyLedger')
+    profiles = list(EmployeeProfile.objects.values_list('user_id', 'hourly_rate_toman'))
+    HourlyRate.objects.bulk_create(
+        (HourlyRate(employee_id=user_id, effective_from=date(2000, 1, 1), hourly_rate_toman=rate) for user_id, rate in profiles),
+        batch_size=1000,
+    )
+    for user_id, rate in profiles:
+        if rate:
+            TimeEntry.objects.filter(employee_id=user_id).update(
+                hourly_rate_toman=rate, cost_toman=(F('duration_minutes') * rate + 30) / 60,
+            )
+
+    DailyRollup.objects.all().delete()
+    grouped = (
+        TimeEntry.objects.filter(is_deleted=False)
+        .values('employee_id', 'date', 'task_id', 'task_title_snapshot', 'task__project_id')
+        .annotate(total_minutes=Sum('duration_minutes'), total_cost=Sum('cost_toman'))
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(
+                employee_id=row['employee_id'], date=row['date'], task_id=row['task_id'],
+                task_title_snapshot=row['task_title_snapshot'], project_id=row['task__project_id'],
+                minutes=row['total_minutes'] or 0, cost_toman=row['total_cost'] or 0,
+            )
+            for row in grouped.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+    earned = {
+        (row['employee_id'], row['date__year'], row['date__month']): row['total'] or 0
+        for row in TimeEntry.objects.filter(is_deleted=False)
+        .values('employee_id', 'date__year', 'date__month')
+        .annotate(total=Sum('cost_toman'))
+        .order_by()
+    }
+    ledgers = []
+    for ledger in MonthlyLedger.objects.all():
+        ledger.earned_toman = earned.get((ledger.employee_id, ledger.year, ledger.month), 0)
+        if ledger.earned_toman:
+            ledgers.append(ledger)
+    MonthlyLedger.objects.bulk_update(ledgers, ['earned_toman'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_sync_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField()),
+                ('hourly_rate_toman', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='cost_toman',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthlyledger',
+            name='earned_toman',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='cost_toman',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='hourly_rate_toman',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrollup',
+            index=models.Index(fields=['date', 'project'], name='tracker_rollup_date_proj_idx'),
+        ),
+        migrations.AddField(
+            model_name='hourlyrate',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_rates', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlyrate',
+            constraint=models.UniqueConstraint(fields=('employee', 'effective_from'), name='tracker_rate_emp_from_uniq'),
+        ),
+        migrations.RunPython(backfill_costs, migrations.RunPython.noop),
+    ]
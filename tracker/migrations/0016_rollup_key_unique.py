@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-17 21:22
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+KEY_FIELDS = ('employee_id', 'date', 'task_id', 'task_title_snapshot', 'project_id')
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    # Rows used to be appended per key; fold every key into its oldest row
+    DailyRollup = apps.get_model('tracker', 'DailyRollup')
+    duplicates = (
+        DailyRollup.objects.values(*KEY_FIELDS)
+        .annotate(rows=Count('id'), keep=Min('id'), total_minutes=Sum('minutes'), total_cost=Sum('cost_toman'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in list(duplicates):
+        DailyRollup.objects.filter(**{field: group[field] for field in KEY_FIELDS}).exclude(pk=group['keep']).delete()
+        if group['total_minutes'] > 0:
+            DailyRollup.objects.filter(pk=group['keep']).update(minutes=group['total_minutes'], cost_toman=group['total_cost'])
+        else:
+            DailyRollup.objects.filter(pk=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_entry_cost'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(models.F('employee'), models.F('date'), django.db.models.functions.comparison.Coalesce('task', 0), models.F('task_title_snapshot'), django.db.models.functions.comparison.Coalesce('project', 0), name='tracker_rollup_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Sum
+
+
+def rekey_moved_task_rollups(apps, schema_editor):
+    # Rollups of tasks moved to another project kept the old project, and
+    # later deletes left negative rows; regroup those tasks from their entries
+    DailyRollup = apps.get_model('tracker', 'DailyRollup')
+    Task = apps.get_model('tracker', 'Task')
+    TimeEntry = apps.get_model('tracker', 'TimeEntry')
+    projects = dict(Task.objects.values_list('id', 'project_id'))
+    stale = {
+        task_id
+        for task_id, project_id in DailyRollup.objects.filter(task__isnull=False).values_list('task_id', 'project_id').distinct()
+        if projects.get(task_id) != project_id
+    }
+    stale |= set(DailyRollup.objects.filter(task__isnull=False, minutes__lte=0).values_list('task_id', flat=True))
+    for task_id in stale:
+        DailyRollup.objects.filter(task_id=task_id).delete()
+        grouped = (
+            TimeEntry.objects.filter(task_id=task_id, is_deleted=False)
+            .values('employee_id', 'date', 'task_title_snapshot')
+            .annotate(total_minutes=Sum('duration_minutes'), total_cost=Sum('cost_toman'))
+            .order_by()
+        )
+        DailyRollup.objects.bulk_create(
+            DailyRollup(
+                employee_id=row['employee_id'], date=row['date'], task_id=task_id,
+                task_title_snapshot=row['task_title_snapshot'], project_id=projects[task_id],
+                minutes=row['total_minutes'] or 0, cost_toman=row['total_cost'] or 0,
+            )
+            for row in grouped
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0016_rollup_key_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_moved_task_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Sum
+
+
+def regroup_taskless_rollups(apps, schema_editor):
+    # Deleting a task nulled the task of its rollup rows but kept their project,
+    # so they no longer matched the keys of their entries; regroup those entries
+    DailyRollup = apps.get_model('tracker', 'DailyRollup')
+    TimeEntry = apps.get_model('tracker', 'TimeEntry')
+    if not DailyRollup.objects.filter(task__isnull=True, project__isnull=False).exists():
+        return
+    DailyRollup.objects.filter(task__isnull=True).delete()
+    grouped = (
+        TimeEntry.objects.filter(task__isnull=True, is_deleted=False)
+        .values('employee_id', 'date', 'task_title_snapshot')
+        .annotate(total_minutes=Sum('duration_minutes'), total_cost=Sum('cost_toman'))
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(
+                employee_id=row['employee_id'], date=row['date'], task_id=None,
+                task_title_snapshot=row['task_title_snapshot'], project_id=None,
+                minutes=row['total_minutes'] or 0, cost_toman=row['total_cost'] or 0,
+            )
+            for row in grouped
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0017_rekey_moved_task_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(regroup_taskless_rollups, migrations.RunPython.noop),
+    ]
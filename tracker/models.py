@@ -1,8 +1,29 @@
+from datetime import datetime, timedelta
+
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.timezone import make_aware
 
 User = get_user_model()
 
+# Entries never span more than a day (overnight entries end on the next date)
+MAX_ENTRY_SPAN = timedelta(days=1)
+# PostgreSQL exclusion constraint added in migration 0008
+NO_OVERLAP_CONSTRAINT = 'tracker_timeentry_no_overlap'
+
+
+def entry_bounds(date, start_time, end_time):
+    """Aware start/end datetimes of an entry; end_time <= start_time means it ends the next day."""
+    local_tz = timezone.get_current_timezone()
+    start_at = make_aware(datetime.combine(date, start_time), local_tz)
+    end_date = date
+    if end_time <= start_time:
+        end_date = date + timedelta(days=1)
+    end_at = make_aware(datetime.combine(end_date, end_time), local_tz)
+    return start_at, end_at
+
 
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -25,6 +46,27 @@ class Task(TimeStampedModel):
         suffix = ' (deleted)' if self.is_deleted else ''
         return f"{self.title}{suffix}"
 
+    class Meta:
+        indexes = [
+            # TaskViewSet: ?project= ordered by -created_at, -id
+            models.Index(fields=['project', 'created_at'], name='tracker_task_project_idx'),
+            # Delta sync: rows changed after a cursor, in (updated_at, id) order
+            models.Index(fields=['updated_at'], name='tracker_task_updated_idx'),
+        ]
+
+
+class TimeEntryQuerySet(models.QuerySet):
+    def overlapping(self, employee_id, start_at, end_at):
+        # Half-open interval overlap; the lower bound on start_at keeps this a
+        # short range scan on the (employee, start_at) index
+        return self.filter(
+            employee_id=employee_id,
+            is_deleted=False,
+            start_at__gt=start_at - MAX_ENTRY_SPAN,
+            start_at__lt=end_at,
+            end_at__gt=start_at,
+        )
+
 
 class TimeEntry(TimeStampedModel):
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='time_entries')
@@ -34,19 +76,56 @@ class TimeEntry(TimeStampedModel):
     start_time = models.TimeField()
     end_time = models.TimeField()
     duration_minutes = models.IntegerField()
+    # Derived from date/start_time/end_time on save; used for overlap checks
+    start_at = models.DateTimeField(editable=False)
+    end_at = models.DateTimeField(editable=False)
     short_description = models.CharField(max_length=300, null=True, blank=True)
     class TimeEntrySource(models.TextChoices):
         MANUAL = 'manual', 'Manual'
         TIMER = 'timer', 'Timer'
+        IMPORT = 'import', 'Import'
     source = models.CharField(max_length=16, choices=TimeEntrySource.choices, default=TimeEntrySource.MANUAL)
     edited_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='time_entries_edited')
     is_deleted = models.BooleanField(default=False)
+    # Rate in effect on `date` and the entry's cost, set by tracker.rates when the entry is written
+    hourly_rate_toman = models.PositiveIntegerField(default=0)
+    cost_toman = models.PositiveBigIntegerField(default=0)
+
+    objects = TimeEntryQuerySet.as_manager()
 
     class Meta:
         indexes = [
             models.Index(fields=['employee', 'date']),
+            models.Index(fields=['employee', 'created_at']),
+            models.Index(
+                fields=['employee', 'start_at', 'end_at'],
+                condition=models.Q(is_deleted=False),
+                name='tracker_timeentry_span_idx',
+            ),
+            # Live entries of one employee by date (entry list, income, task breakdown)
+            models.Index(
+                fields=['employee', 'date', 'start_time'],
+                condition=models.Q(is_deleted=False),
+                name='tracker_te_live_emp_date_idx',
+            ),
+            # Live entries of everyone by date (admin list, month-wide income and project spend)
+            models.Index(
+                fields=['date', 'start_time'],
+                condition=models.Q(is_deleted=False),
+                name='tracker_te_live_date_idx',
+            ),
+            # Delta sync of one employee's entries, and of everyone's for admins
+            models.Index(fields=['employee', 'updated_at'], name='tracker_te_emp_updated_idx'),
+            models.Index(fields=['updated_at'], name='tracker_te_updated_idx'),
         ]
 
+    def save(self, *args, **kwargs):
+        self.start_at, self.end_at = entry_bounds(self.date, self.start_time, self.end_time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'start_at', 'end_at'}
+        super().save(*args, **kwargs)
+
 
 class TimeEntryEdit(models.Model):
     time_entry = models.ForeignKey(TimeEntry, on_delete=models.CASCADE, related_name='edits')
@@ -75,6 +154,11 @@ class Project(TimeStampedModel):
         suffix = ' (deleted)' if self.is_deleted else ''
         return f"{self.name}{suffix}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='tracker_project_updated_idx'),
+        ]
+
 
 class ProjectMembership(TimeStampedModel):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='memberships')
@@ -98,6 +182,21 @@ class EmployeeProfile(TimeStampedModel):
         ('team_lead', 'Team Lead'),
     )
     role = models.CharField(max_length=32, choices=ROLE_CHOICES, default='developer')
+    # settled_at of the latest Settlement; the employee only sees entries created after it
+    visible_since = models.DateTimeField(null=True, blank=True)
+
+
+class HourlyRate(models.Model):
+    """Rate of an employee from `effective_from` until the next row; written by tracker.rates."""
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hourly_rates')
+    effective_from = models.DateField()
+    hourly_rate_toman = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'effective_from'], name='tracker_rate_emp_from_uniq'),
+        ]
 
 
 class ProjectMonthlyBudget(TimeStampedModel):
@@ -117,6 +216,60 @@ class Settlement(TimeStampedModel):
     amount_toman = models.PositiveIntegerField(default=0)
     settled_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'year', 'month'], name='tracker_settle_emp_period_idx'),
+            models.Index(fields=['year', 'month'], name='tracker_settle_period_idx'),
+        ]
+
 
+class DailyRollup(models.Model):
+    """Minutes and cost per employee/date/task/project, kept in step with TimeEntry by tracker.rollups.
 
+    One row per key; readers still aggregate with SUM, over several keys.
+    """
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    task = models.ForeignKey(Task, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    task_title_snapshot = models.CharField(max_length=150)
+    project = models.ForeignKey(Project, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    minutes = models.IntegerField(default=0)
+    cost_toman = models.BigIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            # Task and project may be NULL, which a plain unique constraint would treat as distinct
+            models.UniqueConstraint(
+                'employee', 'date', Coalesce('task', 0), 'task_title_snapshot',
+                Coalesce('project', 0),
+                name='tracker_rollup_key_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'date']),
+            # Project spend and budgets of a month
+            models.Index(fields=['date', 'project'], name='tracker_rollup_date_proj_idx'),
+        ]
+
+
+class MonthlyLedger(models.Model):
+    """Minutes logged, income earned and amount paid per employee and month, kept in step by tracker.ledger.
+
+    Earned income is the sum of the entries' cost, so it follows the rate
+    history rather than the employee's current rate.
+    """
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledgers')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    minutes = models.IntegerField(default=0)
+    earned_toman = models.PositiveBigIntegerField(default=0)
+    paid_toman = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'year', 'month'], name='tracker_ledger_emp_period_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month'], name='tracker_ledger_period_idx'),
+        ]
@@ -0,0 +1,113 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+def _flip(field: str) -> str:
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination without COUNT(*); clients pick page_size up to max_page_size.
+
+    Unlike DRF's CursorPagination, which keys the cursor on the first ordering
+    field and falls back to an offset among rows sharing it, the cursor holds
+    the whole ordering tuple of a row and the next page is the rows strictly
+    after it. `ordering` must therefore end in a unique field.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = [_flip(field) for field in self.ordering] if reverse else list(self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            position = self._decode_position(self.cursor.position)
+            try:
+                queryset = queryset.filter(self._after(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+
+        # Positions are rows at the edges of the page; a missing one means there is no link
+        if reverse:
+            self.page.reverse()
+            self.next_position = self._position(self.page[-1]) if self.page else position
+            self.previous_position = self._position(self.page[0]) if has_more else None
+        else:
+            self.next_position = self._position(self.page[-1]) if has_more else None
+            self.previous_position = self._position(self.page[0]) if self.page and self.cursor is not None else None
+        self.has_next = self.next_position is not None
+        self.has_previous = self.previous_position is not None
+        return self.page
+
+    def _position(self, row) -> list:
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def _decode_position(self, position) -> list:
+        try:
+            values = json.loads(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _after(ordering, values) -> Q:
+        # (a, b, c) after (x, y, z): a > x, or a = x and b > y, or a = x and b = y and c > z
+        ranges = []
+        for i, field in enumerate(ordering):
+            equal = {other.lstrip('-'): values[j] for j, other in enumerate(ordering[:i])}
+            lookup = f"{field.lstrip('-')}__{'lt' if field.startswith('-') else 'gt'}"
+            ranges.append(Q(**equal, **{lookup: values[i]}))
+        return reduce(or_, ranges)
+
+    def _link(self, reverse: bool, position):
+        if position is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=json.dumps(position, separators=(',', ':'))))
+
+    def get_next_link(self):
+        return self._link(False, self.next_position)
+
+    def get_previous_link(self):
+        return self._link(True, self.previous_position)
+
+
+class TimeEntryPagination(KeysetPagination):
+    ordering = ('-date', '-start_time', '-id')
+
+
+class SettlementPagination(KeysetPagination):
+    ordering = ('-settled_at', '-id')
+
+
+class TaskPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class EmployeePagination(KeysetPagination):
+    ordering = ('username',)
@@ -0,0 +1,23 @@
+from datetime import date
+from typing import Dict, Tuple
+
+from django.utils import timezone
+
+
+def current_month() -> Tuple[int, int]:
+    """(year, month) of today in TIME_ZONE, not in the server's local time."""
+    today = timezone.localdate()
+    return today.year, today.month
+
+
+def month_window(year: int, month: int) -> Tuple[date, date]:
+    """Half-open [first day, first day of next month) range of a month."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def in_month(year: int, month: int, field: str = 'date') -> Dict[str, date]:
+    """Range lookups selecting a month on a DateField; sargable on every backend."""
+    start, end = month_window(year, month)
+    return {f'{field}__gte': start, f'{field}__lt': end}
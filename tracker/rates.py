@@ -0,0 +1,97 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ledger, rollups
+from .models import EmployeeProfile, HourlyRate, TimeEntry
+from .report_cache import bump_table_version, bump_version
+from .reporting import income_toman
+
+# Effective date of an employee's first rate, so it covers all their earlier work
+FIRST_DAY = date(2000, 1, 1)
+
+
+class RateBook:
+    """Rate history of a set of employees, loaded with one query, for pricing batches of entries."""
+
+    def __init__(self, employee_ids: Iterable[int]):
+        self._days: Dict[int, List[date]] = defaultdict(list)
+        self._rates: Dict[int, List[int]] = defaultdict(list)
+        rows = (
+            HourlyRate.objects.filter(employee_id__in=set(employee_ids))
+            .order_by('employee_id', 'effective_from')
+            .values_list('employee_id', 'effective_from', 'hourly_rate_toman')
+        )
+        for employee_id, day, rate in rows:
+            self._days[employee_id].append(day)
+            self._rates[employee_id].append(rate)
+
+    def rate(self, employee_id: int, day: date) -> int:
+        pos = bisect_right(self._days.get(employee_id, ()), day)
+        return self._rates[employee_id][pos - 1] if pos else 0
+
+
+def rate_on(employee_id: int, day: date) -> int:
+    """Hourly rate of an employee on a day; 0 before their first rate."""
+    return (
+        HourlyRate.objects.filter(employee_id=employee_id, effective_from__lte=day)
+        .order_by('-effective_from')
+        .values_list('hourly_rate_toman', flat=True)
+        .first()
+    ) or 0
+
+
+def snapshot(employee_id: int, day: date, minutes: int, book: Optional[RateBook] = None) -> Dict[str, int]:
+    """hourly_rate_toman and cost_toman of an entry, to store along with it."""
+    rate = book.rate(employee_id, day) if book is not None else rate_on(employee_id, day)
+    return {'hourly_rate_toman': rate, 'cost_toman': income_toman(minutes, rate)}
+
+
+def price(entries: Iterable[TimeEntry], book: Optional[RateBook] = None) -> None:
+    """Set the rate and cost of unsaved entries; one query for the whole batch."""
+    entries = list(entries)
+    if book is None:
+        book = RateBook(entry.employee_id for entry in entries)
+    for entry in entries:
+        for field, value in snapshot(entry.employee_id, entry.date, entry.duration_minutes, book).items():
+            setattr(entry, field, value)
+
+
+def set_rate(employee_id: int, rate: int, effective_from: Optional[date] = None) -> int:
+    """Record an hourly rate from `effective_from` (default today); returns the number of entries re-priced.
+
+    Entries dated from effective_from up to the employee's next rate change
+    take the new rate; earlier months keep what they were written with. The
+    profile's hourly_rate_toman follows the rate in effect today.
+    """
+    today = timezone.localdate()
+    effective_from = effective_from or today
+    with transaction.atomic():
+        HourlyRate.objects.update_or_create(
+            employee_id=employee_id, effective_from=effective_from, defaults={'hourly_rate_toman': rate},
+        )
+        entries = TimeEntry.objects.filter(employee_id=employee_id, date__gte=effective_from)
+        until = (
+            HourlyRate.objects.filter(employee_id=employee_id, effective_from__gt=effective_from)
+            .order_by('effective_from')
+            .values_list('effective_from', flat=True)
+            .first()
+        )
+        if until is not None:
+            entries = entries.filter(date__lt=until)
+        # Same rounding as income_toman; updated_at stays, entries read the same through the API
+        repriced = entries.exclude(hourly_rate_toman=rate).update(
+            hourly_rate_toman=rate, cost_toman=(F('duration_minutes') * rate + 30) / 60,
+        )
+        EmployeeProfile.objects.update_or_create(user_id=employee_id, defaults={'hourly_rate_toman': rate_on(employee_id, today)})
+        if repriced:
+            rollups.rebuild([employee_id])
+            ledger.reconcile([employee_id])
+            bump_version(employee_id)
+            bump_table_version(TimeEntry)
+    return repriced
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import metrics
+
+PREFIX = 'reports'
+GLOBAL_SCOPE = 'all'
+
+
+def get_cache():
+    return caches[getattr(settings, 'REPORT_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope) -> str:
+    return f'{PREFIX}:version:{scope}'
+
+
+def get_version(scope) -> int:
+    cache = get_cache()
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version never reuses an old number
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(scope) -> None:
+    cache = get_cache()
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_version(employee_id: int) -> None:
+    """Invalidate cached reports of an employee and the cross-employee reports, once committed."""
+    def bump():
+        _bump(employee_id)
+        _bump(GLOBAL_SCOPE)
+    transaction.on_commit(bump)
+
+
+def bump_global_version() -> None:
+    """Invalidate only the cross-employee reports (project budgets, income summary), once committed."""
+    transaction.on_commit(lambda: _bump(GLOBAL_SCOPE))
+
+
+def _table_scope(model) -> str:
+    return f'table:{model._meta.db_table}'
+
+
+def table_versions(models) -> list:
+    """Data versions of whole tables, in the order given; one cache round trip once they are set."""
+    keys = [_version_key(_table_scope(model)) for model in models]
+    found = get_cache().get_many(keys)
+    return [found.get(key) or get_version(_table_scope(model)) for key, model in zip(keys, models)]
+
+
+def bump_table_version(*models) -> None:
+    """Invalidate list and detail ETags built from these tables, once committed."""
+    def bump():
+        for model in models:
+            _bump(_table_scope(model))
+    transaction.on_commit(bump)
+
+
+def _count(name: str) -> None:
+    cache = get_cache()
+    key = f'{PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def stats() -> Dict[str, int]:
+    cache = get_cache()
+    return {
+        'hits': cache.get(f'{PREFIX}:stats:hits', 0),
+        'misses': cache.get(f'{PREFIX}:stats:misses', 0),
+    }
+
+
+def cached_report(endpoint: str, employee_id: Optional[int], params: Dict[str, Any], compute: Callable[[], Any]):
+    """Return compute() through the report cache.
+
+    Keys include the data version of the employee (or the global version when
+    employee_id is None), so writes invalidate exactly the affected reports.
+    """
+    cache = get_cache()
+    scope = GLOBAL_SCOPE if employee_id is None else employee_id
+    digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    key = f'{PREFIX}:{endpoint}:{scope}:{get_version(scope)}:{digest}'
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        metrics.REPORT_CACHE.labels('hit').inc()
+        return data
+    _count('misses')
+    metrics.REPORT_CACHE.labels('miss').inc()
+    data = compute()
+    cache.set(key, data, timeout=getattr(settings, 'REPORT_CACHE_TIMEOUT', None))
+    return data
+
+
+async def acached_report(endpoint: str, employee_id: Optional[int], params: Dict[str, Any], compute: Callable[[], Any]):
+    """cached_report() for async views; the cache lookup and the ORM work run in the request's worker thread."""
+    return await sync_to_async(cached_report)(endpoint, employee_id, params, compute)
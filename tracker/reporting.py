@@ -2,16 +2,19 @@ from collections import defaultdict
 from datetime import date
 from typing import Dict, List, Tuple
 
-from django.db.models import Sum
+from django.contrib.auth import get_user_model
+from django.db.models import Q, Sum
 
-from .models import TimeEntry
+from .models import DailyRollup, EmployeeProfile, MonthlyLedger, TimeEntry, Project, ProjectMonthlyBudget
+from .periods import in_month, month_window
 
 
 def daily_totals(employee_id: int, start: date, end: date):
     qs = (
-        TimeEntry.objects.filter(employee_id=employee_id, date__range=(start, end), is_deleted=False)
+        DailyRollup.objects.filter(employee_id=employee_id, date__range=(start, end))
         .values('date')
-        .annotate(total_minutes=Sum('duration_minutes'))
+        .annotate(total_minutes=Sum('minutes'))
+        .filter(total_minutes__gt=0)
         .order_by('date')
     )
     return [{'date': row['date'].isoformat(), 'minutes': row['total_minutes'] or 0} for row in qs]
@@ -20,9 +23,10 @@ def daily_totals(employee_id: int, start: date, end: date):
 def weekly_totals(employee_id: int, start: date, end: date):
     # Group by ISO year-week
     qs = (
-        TimeEntry.objects.filter(employee_id=employee_id, date__range=(start, end), is_deleted=False)
+        DailyRollup.objects.filter(employee_id=employee_id, date__range=(start, end))
         .values('date__iso_year', 'date__week')
-        .annotate(total_minutes=Sum('duration_minutes'))
+        .annotate(total_minutes=Sum('minutes'))
+        .filter(total_minutes__gt=0)
         .order_by('date__iso_year', 'date__week')
     )
     return [
@@ -33,9 +37,10 @@ def weekly_totals(employee_id: int, start: date, end: date):
 
 def monthly_totals(employee_id: int, start: date, end: date):
     qs = (
-        TimeEntry.objects.filter(employee_id=employee_id, date__range=(start, end), is_deleted=False)
+        DailyRollup.objects.filter(employee_id=employee_id, date__range=(start, end))
         .values('date__year', 'date__month')
-        .annotate(total_minutes=Sum('duration_minutes'))
+        .annotate(total_minutes=Sum('minutes'))
+        .filter(total_minutes__gt=0)
         .order_by('date__year', 'date__month')
     )
     return [
@@ -46,9 +51,10 @@ def monthly_totals(employee_id: int, start: date, end: date):
 
 def monthly_task_pie(employee_id: int, year: int, month: int):
     qs = (
-        TimeEntry.objects.filter(employee_id=employee_id, date__year=year, date__month=month, is_deleted=False)
+        DailyRollup.objects.filter(employee_id=employee_id, **in_month(year, month))
         .values('task_id', 'task_title_snapshot')
-        .annotate(total_minutes=Sum('duration_minutes'))
+        .annotate(total_minutes=Sum('minutes'))
+        .filter(total_minutes__gt=0)
         .order_by('-total_minutes')
     )
     total = sum((row['total_minutes'] or 0) for row in qs) or 1
@@ -65,6 +71,54 @@ def monthly_task_pie(employee_id: int, year: int, month: int):
     return data
 
 
+def dashboard(employee_id: int, start: date, end: date, year: int, month: int):
+    """Daily, ISO-weekly and monthly series over start..end plus the task pie of year/month.
+
+    All four are derived in one pass over a single grouped rollup query.
+    """
+    month_start, month_end = month_window(year, month)
+    qs = (
+        DailyRollup.objects.filter(employee_id=employee_id)
+        .filter(Q(date__range=(start, end)) | Q(**in_month(year, month)))
+        .values('date', 'task_id', 'task_title_snapshot')
+        .annotate(total_minutes=Sum('minutes'))
+        .order_by('date')
+    )
+    daily: Dict[date, int] = defaultdict(int)
+    weekly: Dict[Tuple[int, int], int] = defaultdict(int)
+    monthly: Dict[Tuple[int, int], int] = defaultdict(int)
+    pie: Dict[Tuple[int, str], int] = defaultdict(int)
+    for row in qs:
+        day = row['date']
+        minutes = row['total_minutes'] or 0
+        if start <= day <= end:
+            iso = day.isocalendar()
+            daily[day] += minutes
+            weekly[(iso[0], iso[1])] += minutes
+            monthly[(day.year, day.month)] += minutes
+        if month_start <= day < month_end:
+            pie[(row['task_id'], row['task_title_snapshot'])] += minutes
+    pie_total = sum(pie.values()) or 1
+    return {
+        'daily': [
+            {'date': day.isoformat(), 'minutes': minutes}
+            for day, minutes in sorted(daily.items()) if minutes > 0
+        ],
+        'weekly': [
+            {'iso_year': key[0], 'iso_week': key[1], 'minutes': minutes}
+            for key, minutes in sorted(weekly.items()) if minutes > 0
+        ],
+        'monthly': [
+            {'year': key[0], 'month': key[1], 'minutes': minutes}
+            for key, minutes in sorted(monthly.items()) if minutes > 0
+        ],
+        'pie': [
+            {'task_id': key[0], 'label': key[1], 'minutes': minutes, 'percent': round((minutes / pie_total) * 100, 2)}
+            for key, minutes in sorted(pie.items(), key=lambda item: -item[1]) if minutes > 0
+        ],
+    }
+
+
 def task_breakdown(employee_id: int, start: date, end: date):
     entries = (
         TimeEntry.objects.filter(employee_id=employee_id, date__range=(start, end), is_deleted=False)
@@ -89,4 +143,133 @@ def task_breakdown(employee_id: int, start: date, end: date):
     return list(tasks.values())
 
 
+def income_toman(minutes: int, rate: int) -> int:
+    # Single rounding rule (half up, in integers) shared by entry costs, settlements
+    # and rates.set_rate, which applies it in SQL
+    return (minutes * (rate or 0) + 30) // 60
+
+
+def employee_income(employee_id: int, year: int, month: int):
+    """Minutes, income and paid/outstanding balance of one employee for a month, read from the monthly ledger.
+
+    hourly_rate_toman is the current rate; income is what the month's entries cost at the rates they were written with.
+    """
+    rate = (
+        EmployeeProfile.objects.filter(user_id=employee_id)
+        .values_list('hourly_rate_toman', flat=True)
+        .first()
+    ) or 0
+    minutes, income, paid = (
+        MonthlyLedger.objects.filter(employee_id=employee_id, year=year, month=month)
+        .values_list('minutes', 'earned_toman', 'paid_toman')
+        .first()
+    ) or (0, 0, 0)
+    return {
+        'year': year,
+        'month': month,
+        'minutes': minutes,
+        'hourly_rate_toman': rate,
+        'income_toman': income,
+        'paid_toman': paid,
+        'outstanding_toman': max(income - paid, 0),
+    }
+
+
+def employees_income(year: int, month: int):
+    """Minutes, income and paid/outstanding balance of every active employee for a month.
+
+    Two queries regardless of headcount: the employees and their ledger rows.
+    """
+    User = get_user_model()
+    users = (
+        User.objects.filter(is_active=True)
+        .order_by('username')
+        .values('id', 'username', 'profile__hourly_rate_toman')
+    )
+    ledgers = {
+        employee_id: (minutes, earned, paid)
+        for employee_id, minutes, earned, paid in MonthlyLedger.objects.filter(year=year, month=month)
+        .values_list('employee_id', 'minutes', 'earned_toman', 'paid_toman')
+    }
+    data = []
+    for u in users:
+        minutes, income, paid = ledgers.get(u['id'], (0, 0, 0))
+        data.append({
+            'employee_id': u['id'],
+            'username': u['username'],
+            'minutes': minutes,
+            'hourly_rate_toman': u['profile__hourly_rate_toman'] or 0,
+            'income_toman': income,
+            'paid_toman': paid,
+            'outstanding_toman': max(income - paid, 0),
+        })
+    return data
+
+
+def _project_rollups(year: int, month: int, **filters):
+    # Minutes and cost summed from the rollups, which carry the project of each task
+    return DailyRollup.objects.filter(**in_month(year, month), **filters)
+
+
+def average_rate(minutes: int, cost: int) -> int:
+    """Hourly rate that `minutes` cost on average; the employee's rate when it did not change."""
+    return int(round(cost * 60 / minutes)) if minutes else 0
+
+
+def project_spend(project_id: int, year: int, month: int):
+    """Spend of a project in a month with a per-employee cost breakdown."""
+    budget = (
+        ProjectMonthlyBudget.objects.filter(project_id=project_id, year=year, month=month)
+        .values_list('budget_toman', flat=True)
+        .first()
+    )
+    rows = (
+        _project_rollups(year, month, project_id=project_id)
+        .values('employee_id', 'employee__username')
+        .annotate(total_minutes=Sum('minutes'), total_cost=Sum('cost_toman'))
+        .filter(total_minutes__gt=0)
+        .order_by('employee__username')
+    )
+    employees = []
+    for row in rows:
+        minutes, cost = row['total_minutes'] or 0, row['total_cost'] or 0
+        employees.append({
+            'employee_id': row['employee_id'],
+            'username': row['employee__username'],
+            'minutes': minutes,
+            'hourly_rate_toman': average_rate(minutes, cost),
+            'cost_toman': cost,
+        })
+    return {
+        'budget_toman': budget or 0,
+        'minutes': sum(e['minutes'] for e in employees),
+        'spent_toman': sum(e['cost_toman'] for e in employees),
+        'employees': employees,
+    }
+
 
+def projects_budget(year: int, month: int):
+    """Budget and spend of every active project in a month."""
+    budgets = dict(
+        ProjectMonthlyBudget.objects.filter(year=year, month=month)
+        .values_list('project_id', 'budget_toman')
+    )
+    totals = {
+        row['project_id']: (row['total_minutes'] or 0, row['total_cost'] or 0)
+        for row in _project_rollups(year, month, project_id__isnull=False)
+        .values('project_id')
+        .annotate(total_minutes=Sum('minutes'), total_cost=Sum('cost_toman'))
+        .order_by()
+    }
+    data = []
+    for project in Project.objects.filter(is_deleted=False).order_by('name').values('id', 'name'):
+        pid = project['id']
+        minutes, spent = totals.get(pid, (0, 0))
+        data.append({
+            'project_id': pid,
+            'name': project['name'],
+            'budget_toman': budgets.get(pid, 0),
+            'minutes': minutes,
+            'spent_toman': spent,
+        })
+    return data
@@ -0,0 +1,205 @@
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from . import ledger
+from .models import DailyRollup, TimeEntry
+from .report_cache import bump_version
+
+# (employee_id, date, task_id, task_title_snapshot, project_id)
+RollupKey = Tuple[int, object, Optional[int], str, Optional[int]]
+# (key, minutes, cost_toman)
+Contribution = Optional[Tuple[RollupKey, int, int]]
+
+KEY_FIELDS = ('employee_id', 'date', 'task_id', 'task_title_snapshot', 'project_id')
+
+
+def contribution(entry: TimeEntry) -> Contribution:
+    """What an entry currently adds to the rollup; None once soft-deleted."""
+    if entry.is_deleted:
+        return None
+    project_id = entry.task.project_id if entry.task_id else None
+    key = (entry.employee_id, entry.date, entry.task_id, entry.task_title_snapshot, project_id)
+    return key, entry.duration_minutes, entry.cost_toman
+
+
+def _add(key: RollupKey, minutes: int, cost: int) -> None:
+    # One row per key (tracker_rollup_key_uniq); it is locked while the delta is applied
+    if not (minutes or cost):
+        return
+    lookup = dict(zip(KEY_FIELDS, key))
+    with transaction.atomic():
+        row = DailyRollup.objects.select_for_update().filter(**lookup).values_list('pk', 'minutes').first()
+        if row is None:
+            # Nothing to subtract from: never store a negative row
+            if minutes <= 0:
+                return
+            try:
+                with transaction.atomic():
+                    DailyRollup.objects.create(minutes=minutes, cost_toman=cost, **lookup)
+                return
+            except IntegrityError:
+                # A concurrent write created the row first; add to it instead
+                row = DailyRollup.objects.select_for_update().filter(**lookup).values_list('pk', 'minutes').get()
+        pk, current = row
+        if current + minutes <= 0:
+            DailyRollup.objects.filter(pk=pk).delete()
+        else:
+            DailyRollup.objects.filter(pk=pk).update(minutes=F('minutes') + minutes, cost_toman=F('cost_toman') + cost)
+
+
+def _ledger_deltas(deltas) -> dict:
+    # Rollup deltas folded per employee month (key[0] is the employee, key[1] the date)
+    months = defaultdict(lambda: [0, 0])
+    for key, (minutes, cost) in deltas:
+        month = months[(key[0], key[1].year, key[1].month)]
+        month[0] += minutes
+        month[1] += cost
+    return months
+
+
+def apply(old: Contribution, new: Contribution) -> None:
+    """Move the rollup and the monthly ledger from an entry's old contribution to its new one."""
+    changes = []
+    if old:
+        changes.append((old[0], (-old[1], -old[2])))
+    if new:
+        changes.append((new[0], (new[1], new[2])))
+    ledger.add_work(_ledger_deltas(changes))
+    if old and new and old[0] == new[0]:
+        _add(new[0], new[1] - old[1], new[2] - old[2])
+        return
+    if old:
+        _add(old[0], -old[1], -old[2])
+    if new:
+        _add(*new)
+
+
+def apply_many(changes: Iterable[Tuple[Contribution, Contribution]]) -> None:
+    """apply() for a batch of (old, new) pairs, folded into one write per rollup key."""
+    deltas = defaultdict(lambda: [0, 0])
+    for old, new in changes:
+        if old:
+            deltas[old[0]][0] -= old[1]
+            deltas[old[0]][1] -= old[2]
+        if new:
+            deltas[new[0]][0] += new[1]
+            deltas[new[0]][1] += new[2]
+    ledger.add_work(_ledger_deltas(deltas.items()))
+    for key, (minutes, cost) in deltas.items():
+        _add(key, minutes, cost)
+
+
+def append_many(entries: Iterable[TimeEntry]) -> None:
+    """Add newly inserted entries to the rollup in bulk, merging into the rows their keys already have.
+
+    One locking read of the batch's employee days, then one bulk update and one
+    bulk insert, instead of an update round trip per key.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        item = contribution(entry)
+        if item:
+            totals[item[0]][0] += item[1]
+            totals[item[0]][1] += item[2]
+    if not totals:
+        return
+    existing = {}
+    rows = DailyRollup.objects.select_for_update().filter(
+        employee_id__in={key[0] for key in totals}, date__in={key[1] for key in totals},
+    )
+    for row in rows:
+        existing.setdefault(tuple(getattr(row, field) for field in KEY_FIELDS), row)
+    changed, missing = [], []
+    for key, (minutes, cost) in totals.items():
+        row = existing.get(key)
+        if row is not None:
+            row.minutes += minutes
+            row.cost_toman += cost
+            changed.append(row)
+        elif minutes > 0:
+            missing.append(DailyRollup(minutes=minutes, cost_toman=cost, **dict(zip(KEY_FIELDS, key))))
+    DailyRollup.objects.bulk_update(changed, ['minutes', 'cost_toman'], batch_size=1000)
+    DailyRollup.objects.bulk_create(missing, batch_size=1000)
+    ledger.add_work(_ledger_deltas(totals.items()))
+
+
+def _rewrite(entries, rollups, batch_size: int) -> int:
+    # Replace `rollups` with the grouped totals of `entries`; returns the number of rows written
+    grouped = (
+        entries.values('employee_id', 'date', 'task_id', 'task_title_snapshot', 'task__project_id')
+        .annotate(total_minutes=Sum('duration_minutes'), total_cost=Sum('cost_toman'))
+        .order_by()
+    )
+    written = 0
+    with transaction.atomic():
+        employee_ids = set(rollups.values_list('employee_id', flat=True).distinct())
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            employee_ids.add(row['employee_id'])
+            batch.append(DailyRollup(
+                employee_id=row['employee_id'],
+                date=row['date'],
+                task_id=row['task_id'],
+                task_title_snapshot=row['task_title_snapshot'],
+                project_id=row['task__project_id'],
+                minutes=row['total_minutes'] or 0,
+                cost_toman=row['total_cost'] or 0,
+            ))
+            if len(batch) >= batch_size:
+                DailyRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            DailyRollup.objects.bulk_create(batch)
+            written += len(batch)
+        for employee_id in employee_ids:
+            bump_version(employee_id)
+    return written
+
+
+def rebuild(employee_ids: Optional[Iterable[int]] = None, batch_size: int = 2000) -> int:
+    """Recompute rollup rows from live time entries; returns the number of rows written.
+
+    Monthly ledgers are repaired separately, by ledger.reconcile().
+    """
+    entries = TimeEntry.objects.filter(is_deleted=False)
+    rollups = DailyRollup.objects.all()
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+        entries = entries.filter(employee_id__in=employee_ids)
+        rollups = rollups.filter(employee_id__in=employee_ids)
+    return _rewrite(entries, rollups, batch_size)
+
+
+def rekey_task(task_id: int, batch_size: int = 2000) -> int:
+    """Recompute the rollup rows of one task, after it moved to another project.
+
+    Only the project part of the keys changes, so the monthly ledgers stay as they are.
+    """
+    entries = TimeEntry.objects.filter(task_id=task_id, is_deleted=False)
+    return _rewrite(entries, DailyRollup.objects.filter(task_id=task_id), batch_size)
+
+
+def detach_task(task_id: int, project_id: Optional[int]) -> None:
+    """Move a task's rollup rows to the taskless keys its entries fall under once the task is deleted.
+
+    Call before the delete: the entries lose their task (and with it the project),
+    and may then share keys with other taskless entries of the same title.
+    """
+    grouped = (
+        TimeEntry.objects.filter(task_id=task_id, is_deleted=False)
+        .values('employee_id', 'date', 'task_title_snapshot')
+        .annotate(total_minutes=Sum('duration_minutes'), total_cost=Sum('cost_toman'))
+        .order_by()
+    )
+    changes = []
+    for row in grouped:
+        minutes, cost = row['total_minutes'] or 0, row['total_cost'] or 0
+        old = (row['employee_id'], row['date'], task_id, row['task_title_snapshot'], project_id)
+        new = (row['employee_id'], row['date'], None, row['task_title_snapshot'], None)
+        changes.append(((old, minutes, cost), (new, minutes, cost)))
+    apply_many(changes)
@@ -1,13 +1,19 @@
-from datetime import datetime, timedelta
-from typing import Any, Dict
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List
 
 from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from django.utils.timezone import make_aware
 from django.db.models import Q
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
-from .models import Task, TimeEntry, TimeEntryEdit, Assignment, Project, ProjectMembership, EmployeeProfile
+from . import metrics, rates, rollups
+from .models import Task, TimeEntry, TimeEntryEdit, Assignment, Project, ProjectMembership, EmployeeProfile, Settlement, MAX_ENTRY_SPAN, NO_OVERLAP_CONSTRAINT, entry_bounds
+from .report_cache import bump_table_version, bump_version
+
+OVERLAP_ERROR = 'Time overlaps with an existing entry.'
 
 
 def get_local_today_yesterday():
@@ -17,7 +23,100 @@ def get_local_today_yesterday():
     return today, yesterday
 
 
-class TaskSerializer(serializers.ModelSerializer):
+@contextmanager
+def overlap_guard():
+    # validate() catches overlaps up front; on PostgreSQL the exclusion
+    # constraint also rejects a concurrent write that slipped past it
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if NO_OVERLAP_CONSTRAINT in str(exc):
+            metrics.overlap_rejected('constraint')
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]})
+        raise
+
+
+def audit_values(entry: TimeEntry) -> Dict[str, Any]:
+    """Snapshot of the editable fields of an entry for TimeEntryEdit rows."""
+    return {
+        'task_id': entry.task_id,
+        'task_title_snapshot': entry.task_title_snapshot,
+        'date': entry.date.isoformat(),
+        'start_time': entry.start_time.isoformat(),
+        'end_time': entry.end_time.isoformat(),
+        'duration_minutes': entry.duration_minutes,
+        'short_description': entry.short_description,
+    }
+
+
+def _values_converter(field, tz):
+    """to_representation of a field for values() rows; None leaves the value as it is."""
+    if isinstance(field, serializers.RelatedField):
+        return None
+    if isinstance(field, serializers.DateTimeField) and tz is not None and not hasattr(field, 'timezone'):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if output_format and output_format.lower() != ISO_8601:
+            # Same result; the field itself looks up the current timezone for every value
+            return lambda value: value.astimezone(tz).strftime(output_format) if timezone.is_aware(value) else field.to_representation(value)
+    return field.to_representation
+
+
+class ValuesSerializerMixin:
+    """Renders list rows straight from queryset.values(*values_lookups()).
+
+    The output matches to_representation() on instances: each field keeps its
+    own to_representation, related fields render the stored id, and a dotted
+    source that crosses a null relation is left out (or None with allow_null),
+    as DRF does. Dotted sources become joins in the same SQL query.
+    """
+
+    @classmethod
+    def _values_plan(cls):
+        plan = cls.__dict__.get('_values_plan_cache')
+        if plan is None:
+            plan = []
+            for field in cls()._readable_fields:
+                if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField, serializers.SerializerMethodField)):
+                    raise TypeError(f'{cls.__name__}.{field.field_name} cannot be rendered from values()')
+                attrs = field.source_attrs
+                # Relations the source passes through; DRF gets an AttributeError when one is null
+                through = ['__'.join(attrs[:i]) for i in range(1, len(attrs))]
+                plan.append((field.field_name, '__'.join(attrs), through, field))
+            cls._values_plan_cache = plan
+        return plan
+
+    @classmethod
+    def values_lookups(cls) -> List[str]:
+        lookups = []
+        for _, lookup, through, _ in cls._values_plan():
+            for name in [*through, lookup]:
+                if name not in lookups:
+                    lookups.append(name)
+        return lookups
+
+    @classmethod
+    def represent_values(cls, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        plan = [
+            (name, lookup, through, _values_converter(field, tz), field.allow_null)
+            for name, lookup, through, field in cls._values_plan()
+        ]
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, through, convert, allow_null in plan:
+                if through and any(row[relation] is None for relation in through):
+                    if allow_null:
+                        item[name] = None
+                    continue
+                value = row[lookup]
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+
+class TaskSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), allow_null=False, required=True)
     class Meta:
         model = Task
@@ -30,7 +129,50 @@ class TaskSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class EmployeeSerializer(serializers.Serializer):
+class ProjectSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ['id', 'name', 'created_by', 'created_at', 'updated_at', 'is_deleted', 'deleted_at']
+        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at', 'deleted_at']
+
+    def create(self, validated_data):
+        validated_data['created_by'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class MembershipSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ProjectMembership
+        fields = ['id', 'project', 'user', 'added_by', 'created_at']
+        read_only_fields = ['id', 'added_by', 'created_at']
+
+    def create(self, validated_data):
+        validated_data['added_by'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class SettlementSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
+    employee_username = serializers.CharField(source='employee.username', read_only=True)
+
+    class Meta:
+        model = Settlement
+        fields = ['id', 'employee', 'employee_username', 'year', 'month', 'amount_toman', 'settled_at']
+
+
+class SparseFieldsMixin:
+    """Accepts a `fields` kwarg limiting the serialized fields to that subset."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class EmployeeSerializer(SparseFieldsMixin, serializers.Serializer):
+    PROFILE_FIELDS = ('hourly_rate_toman', 'employee_code', 'phone', 'role')
+
     id = serializers.IntegerField(read_only=True)
     username = serializers.CharField()
     email = serializers.EmailField(required=False, allow_blank=True)
@@ -42,31 +184,200 @@ class EmployeeSerializer(serializers.Serializer):
     phone = serializers.SerializerMethodField()
     role = serializers.SerializerMethodField()
 
+    # Profile fields read from the prefetched `profile` relation; querysets
+    # should select_related('profile') to avoid one query per employee
+    def _profile(self, obj):
+        return getattr(obj, 'profile', None)
+
     def get_hourly_rate_toman(self, obj):
-        profile = getattr(obj, 'profile', None)
-        return getattr(profile, 'hourly_rate_toman', 0)
+        return getattr(self._profile(obj), 'hourly_rate_toman', 0)
 
     def get_employee_code(self, obj):
-        profile = getattr(obj, 'profile', None)
-        return getattr(profile, 'employee_code', None)
+        return getattr(self._profile(obj), 'employee_code', None)
 
     def get_phone(self, obj):
-        profile = getattr(obj, 'profile', None)
-        return getattr(profile, 'phone', None)
+        return getattr(self._profile(obj), 'phone', None)
 
     def get_role(self, obj):
-        profile = getattr(obj, 'profile', None)
-        return getattr(profile, 'role', None)
+        return getattr(self._profile(obj), 'role', None)
+
+
+class TaskField(serializers.PrimaryKeyRelatedField):
+    """Task by pk; bulk requests pass their prefetched tasks in context['tasks']."""
+
+    def to_internal_value(self, data):
+        tasks = self.context.get('tasks')
+        if tasks is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            task = tasks.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if task is None:
+            self.fail('does_not_exist', pk_value=data)
+        return task
+
+
+class BulkTimeEntrySerializer(serializers.ListSerializer):
+    """Creates and updates a batch of entries all-or-nothing.
+
+    Items carrying an `id` replace that entry (looked up in context['instances']);
+    the rest are created for the requesting user. Overlaps are checked across
+    the batch and against stored entries, with one range per employee and day.
+    """
+
+    def run_child_validation(self, data):
+        instance = None
+        if isinstance(data, dict) and data.get('id') is not None:
+            instance = self.context['instances'].get(data['id'])
+            if instance is None:
+                raise serializers.ValidationError({'id': 'Time entry not found.'})
+        self.child.instance = instance
+        try:
+            attrs = super().run_child_validation(data)
+        finally:
+            self.child.instance = None
+        attrs['instance'] = instance
+        return attrs
 
+    def to_internal_value(self, data):
+        # Batch checks raise per-item errors in the same list shape as field errors
+        return self._validate_batch(super().to_internal_value(data))
 
-class TimeEntrySerializer(serializers.ModelSerializer):
+    def _validate_batch(self, attrs_list):
+        user = self.context['request'].user
+        errors = [{} for _ in attrs_list]
+
+        # Membership of every project the batch logs time against, in one query
+        if not (user.is_staff or user.is_superuser):
+            project_ids = {a['task'].project_id for a in attrs_list if a.get('task') and a['task'].project_id}
+            member_of = set(
+                ProjectMembership.objects.filter(user=user, project_id__in=project_ids).values_list('project_id', flat=True)
+            )
+            for idx, attrs in enumerate(attrs_list):
+                task = attrs.get('task')
+                if task and task.project_id and task.project_id not in member_of:
+                    errors[idx] = {api_settings.NON_FIELD_ERRORS_KEY: ['You are not a member of this project']}
+
+        by_employee: Dict[int, list] = {}
+        days: Dict[tuple, list] = {}
+        for idx, attrs in enumerate(attrs_list):
+            instance = attrs['instance']
+            employee_id = user.pk if instance is None else instance.employee_id
+            start_at, end_at = entry_bounds(attrs['date'], attrs['start_time'], attrs['end_time'])
+            by_employee.setdefault(employee_id, []).append((start_at, end_at, idx))
+            day = days.setdefault((employee_id, attrs['date']), [start_at, end_at])
+            day[0], day[1] = min(day[0], start_at), max(day[1], end_at)
+
+        # Within the batch: both items of every overlapping pair are flagged
+        for spans in by_employee.values():
+            spans.sort()
+            active = []
+            for start_at, end_at, idx in spans:
+                active = [(other_end, other_idx) for other_end, other_idx in active if other_end > start_at]
+                if active:
+                    errors[idx] = {api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]}
+                    for _, other_idx in active:
+                        errors[other_idx] = {api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]}
+                active.append((end_at, idx))
+
+        # Against stored entries, excluding the ones this batch rewrites: one query
+        # over short per-day ranges of the (employee, start_at) index
+        replaced = [a['instance'].pk for a in attrs_list if a['instance'] is not None]
+        ranges = Q()
+        for (employee_id, _), (day_start, day_end) in days.items():
+            ranges |= Q(
+                employee_id=employee_id,
+                start_at__gt=day_start - MAX_ENTRY_SPAN,
+                start_at__lt=day_end,
+                end_at__gt=day_start,
+            )
+        existing: Dict[int, list] = {}
+        if ranges:
+            rows = TimeEntry.objects.filter(ranges, is_deleted=False).exclude(pk__in=replaced)
+            for employee_id, start_at, end_at in rows.values_list('employee_id', 'start_at', 'end_at'):
+                existing.setdefault(employee_id, []).append((start_at, end_at))
+        for employee_id, spans in by_employee.items():
+            stored = existing.get(employee_id, [])
+            for start_at, end_at, idx in spans:
+                if any(start_at < other_end and other_start < end_at for other_start, other_end in stored):
+                    errors[idx] = {api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]}
+
+        overlaps = sum(1 for error in errors if error.get(api_settings.NON_FIELD_ERRORS_KEY) == [OVERLAP_ERROR])
+        if overlaps:
+            metrics.overlap_rejected('bulk', overlaps)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs_list
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        now = timezone.now()
+        created, updated, edits, changes, results = [], [], [], [], []
+        book = rates.RateBook({user.pk} | {attrs['instance'].employee_id for attrs in validated_data if attrs['instance']})
+        for attrs in validated_data:
+            instance = attrs.pop('instance')
+            task = attrs.get('task')
+            values = {
+                **attrs,
+                'task_title_snapshot': task.title if task else '',
+                'duration_minutes': self.child._compute_duration_minutes(attrs['date'], attrs['start_time'], attrs['end_time']),
+                'edited_by': user,
+            }
+            employee_id = user.pk if instance is None else instance.employee_id
+            values.update(rates.snapshot(employee_id, attrs['date'], values['duration_minutes'], book))
+            values['start_at'], values['end_at'] = entry_bounds(attrs['date'], attrs['start_time'], attrs['end_time'])
+            if instance is None:
+                values.setdefault('source', TimeEntry.TimeEntrySource.MANUAL)
+                entry = TimeEntry(employee=user, **values)
+                created.append(entry)
+                changes.append((None, entry))
+            else:
+                # Source is fixed at creation, as in single updates
+                values.pop('source', None)
+                old_values = audit_values(instance)
+                old_contribution = rollups.contribution(instance)
+                for field, value in values.items():
+                    setattr(instance, field, value)
+                instance.updated_at = now
+                entry = instance
+                updated.append(entry)
+                edits.append(TimeEntryEdit(time_entry=entry, editor=user, old_values=old_values, new_values=audit_values(entry)))
+                changes.append((old_contribution, entry))
+            results.append(entry)
+
+        with overlap_guard():
+            TimeEntry.objects.bulk_create(created)
+            metrics.entries_created(created)
+            if updated:
+                TimeEntry.objects.bulk_update(updated, BULK_UPDATE_FIELDS)
+            TimeEntryEdit.objects.bulk_create(edits)
+            rollups.apply_many([(old, rollups.contribution(entry)) for old, entry in changes])
+            for employee_id in {entry.employee_id for entry in results}:
+                bump_version(employee_id)
+            # bulk_create and bulk_update send no post_save
+            bump_table_version(TimeEntry)
+        return results
+
+
+BULK_UPDATE_FIELDS = [
+    'task', 'task_title_snapshot', 'date', 'start_time', 'end_time', 'start_at', 'end_at',
+    'duration_minutes', 'hourly_rate_toman', 'cost_toman', 'short_description', 'edited_by', 'updated_at',
+]
+
+
+class TimeEntrySerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     task_title_snapshot = serializers.CharField(read_only=True)
     employee = serializers.PrimaryKeyRelatedField(read_only=True)
     project_id = serializers.IntegerField(source='task.project_id', read_only=True)
     project_name = serializers.CharField(source='task.project.name', read_only=True)
+    task = TaskField(queryset=Task.objects.select_related('project'), allow_null=True, required=False)
 
     class Meta:
         model = TimeEntry
+        list_serializer_class = BulkTimeEntrySerializer
         fields = [
             'id', 'employee', 'task', 'task_title_snapshot', 'date',
             'start_time', 'end_time', 'duration_minutes', 'short_description',
@@ -105,58 +416,24 @@ class TimeEntrySerializer(serializers.ModelSerializer):
                 if date not in (today, yesterday):
                     raise serializers.ValidationError({'date': 'You can only log hours for today or yesterday.'})
 
-        # Overlap prevention on same employee/date, considering overnight spans
-        employee = user if self.instance is None else self.instance.employee
-        start_minutes = start_time.hour * 60 + start_time.minute
-        end_minutes = end_time.hour * 60 + end_time.minute
-
-        # Represent current interval possibly as two segments if it crosses midnight
-        if end_minutes < start_minutes:
-            current_segments = [
-                (date, start_minutes, 24 * 60),  # from start to midnight of date
-                (date + timedelta(days=1), 0, end_minutes),  # from midnight to end on next day
-            ]
-        else:
-            current_segments = [(date, start_minutes, end_minutes)]
-
-        # Check overlaps against entries on same date and adjacent day if needed
-        dates_to_check = {seg_date for seg_date, _, _ in current_segments}
-        # Also include base date to handle existing entries properly
-        dates_to_check.add(date)
-
-        for check_date in sorted(dates_to_check):
-            qs = TimeEntry.objects.filter(employee=employee, date=check_date, is_deleted=False)
-            if self.instance is not None:
-                qs = qs.exclude(pk=self.instance.pk)
-            # find the segment on this check_date
-            relevant_segments = [(s, e) for seg_date, s, e in current_segments if seg_date == check_date]
-            if not relevant_segments:
-                continue
-            seg_start, seg_end = relevant_segments[0]
-            for other in qs.only('start_time', 'end_time'):
-                s = other.start_time.hour * 60 + other.start_time.minute
-                e = other.end_time.hour * 60 + other.end_time.minute
-                # Note: existing entries are guaranteed non-overnight historically; but guard anyway
-                if e < s:
-                    other_segments = [(s, 24 * 60), (0, e)]
-                else:
-                    other_segments = [(s, e)]
-                for os, oe in other_segments:
-                    # Overlap if not (seg_end <= os or seg_start >= oe)
-                    if not (seg_end <= os or seg_start >= oe):
-                        raise serializers.ValidationError('Time overlaps with an existing entry.')
+        # Bulk requests check overlaps for the whole batch in BulkTimeEntrySerializer
+        if self.context.get('bulk'):
+            return attrs
+
+        # Overlap prevention against the employee's stored intervals (overnight spans included)
+        employee_id = user.pk if self.instance is None else self.instance.employee_id
+        start_at, end_at = entry_bounds(date, start_time, end_time)
+        qs = TimeEntry.objects.overlapping(employee_id, start_at, end_at)
+        if self.instance is not None:
+            qs = qs.exclude(pk=self.instance.pk)
+        if qs.exists():
+            metrics.overlap_rejected('validate')
+            raise serializers.ValidationError(OVERLAP_ERROR)
 
         return attrs
 
     def _compute_duration_minutes(self, date, start_time, end_time) -> int:
-        # Use timezone-aware datetimes with project TZ for DST-safe differences
-        local_tz = timezone.get_current_timezone()
-        start_dt = make_aware(datetime.combine(date, start_time), local_tz)
-        end_date = date
-        if end_time <= start_time:
-            # Overnight: advance end date by one day
-            end_date = date + timedelta(days=1)
-        end_dt = make_aware(datetime.combine(end_date, end_time), local_tz)
+        start_dt, end_dt = entry_bounds(date, start_time, end_time)
         delta = end_dt - start_dt
         return int(delta.total_seconds() // 60)
 
@@ -172,13 +449,17 @@ class TimeEntrySerializer(serializers.ModelSerializer):
         if task and task.project:
             if not (user.is_staff or user.is_superuser) and not ProjectMembership.objects.filter(project=task.project, user=user).exists():
                 raise serializers.ValidationError('You are not a member of this project')
+        # Everything derived is set up front so the entry is written with one INSERT
         validated_data['task_title_snapshot'] = task.title if task else ''
         validated_data['duration_minutes'] = self._compute_duration_minutes(
             validated_data['date'], validated_data['start_time'], validated_data['end_time']
         )
-        instance = super().create(validated_data)
-        instance.edited_by = user
-        instance.save(update_fields=['edited_by'])
+        validated_data.update(rates.snapshot(user.pk, validated_data['date'], validated_data['duration_minutes']))
+        validated_data['edited_by'] = user
+        with overlap_guard():
+            instance = super().create(validated_data)
+            rollups.apply(None, rollups.contribution(instance))
+            metrics.entries_created([instance])
         return instance
 
     def update(self, instance: TimeEntry, validated_data: Dict[str, Any]) -> TimeEntry:
@@ -188,35 +469,28 @@ class TimeEntrySerializer(serializers.ModelSerializer):
         if 'source' in validated_data:
             validated_data.pop('source', None)
 
-        old_values = {
-            'task_id': instance.task_id,
-            'task_title_snapshot': instance.task_title_snapshot,
-            'date': instance.date.isoformat(),
-            'start_time': instance.start_time.isoformat(),
-            'end_time': instance.end_time.isoformat(),
-            'duration_minutes': instance.duration_minutes,
-            'short_description': instance.short_description,
-        }
-
-        instance = super().update(instance, validated_data)
-
-        if 'task' in validated_data and instance.task:
-            instance.task_title_snapshot = instance.task.title
-
-        instance.duration_minutes = self._compute_duration_minutes(instance.date, instance.start_time, instance.end_time)
-        instance.edited_by = user
-        instance.save()
-
-        new_values = {
-            'task_id': instance.task_id,
-            'task_title_snapshot': instance.task_title_snapshot,
-            'date': instance.date.isoformat(),
-            'start_time': instance.start_time.isoformat(),
-            'end_time': instance.end_time.isoformat(),
-            'duration_minutes': instance.duration_minutes,
-            'short_description': instance.short_description,
-        }
-        TimeEntryEdit.objects.create(time_entry=instance, editor=user, old_values=old_values, new_values=new_values)
+        old_values = audit_values(instance)
+        old_contribution = rollups.contribution(instance)
+
+        # Derived fields go into validated_data so super().update() saves once
+        task = validated_data.get('task')
+        if task:
+            validated_data['task_title_snapshot'] = task.title
+        validated_data['duration_minutes'] = self._compute_duration_minutes(
+            validated_data.get('date', instance.date),
+            validated_data.get('start_time', instance.start_time),
+            validated_data.get('end_time', instance.end_time),
+        )
+        validated_data.update(rates.snapshot(
+            instance.employee_id, validated_data.get('date', instance.date), validated_data['duration_minutes'],
+        ))
+        validated_data['edited_by'] = user
+
+        with overlap_guard():
+            instance = super().update(instance, validated_data)
+            new_values = audit_values(instance)
+            TimeEntryEdit.objects.create(time_entry=instance, editor=user, old_values=old_values, new_values=new_values)
+            rollups.apply(old_contribution, rollups.contribution(instance))
         return instance
 
 
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import instrumentation, rollups
+from .models import DailyRollup, EmployeeProfile, HourlyRate, Project, ProjectMembership, ProjectMonthlyBudget, Settlement, Task, TimeEntry
+from .report_cache import bump_global_version, bump_table_version, bump_version
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=TimeEntry)
+@receiver([post_save, post_delete], sender=Settlement)
+@receiver([post_save, post_delete], sender=HourlyRate)
+def invalidate_employee_reports(sender, instance, **kwargs):
+    bump_version(instance.employee_id)
+
+
+@receiver([post_save, post_delete], sender=EmployeeProfile)
+def invalidate_profile_reports(sender, instance, **kwargs):
+    bump_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_reports(sender, instance, **kwargs):
+    bump_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=ProjectMonthlyBudget)
+def invalidate_project_reports(sender, instance, **kwargs):
+    bump_global_version()
+
+
+@receiver([post_save, pre_delete], sender=Task)
+def invalidate_task_reports(sender, instance, created=False, **kwargs):
+    # Employee reports show the task (is_task_deleted) and are cached under the employee's
+    # version; pre_delete still finds the entries before they are detached from the task
+    if created:
+        return
+    entries = TimeEntry.objects.filter(task_id=instance.pk, is_deleted=False)
+    for employee_id in entries.values_list('employee_id', flat=True).order_by().distinct():
+        bump_version(employee_id)
+
+
+@receiver([post_save, post_delete], sender=TimeEntry)
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=ProjectMembership)
+@receiver([post_save, post_delete], sender=Settlement)
+@receiver([post_save, post_delete], sender=EmployeeProfile)
+@receiver([post_save, post_delete], sender=User)
+def invalidate_etags(sender, instance, **kwargs):
+    bump_table_version(sender)
+
+
+@receiver([post_save, post_delete], sender=ProjectMembership)
+def touch_project(sender, instance, **kwargs):
+    # Delta sync finds membership changes through the project's updated_at
+    Project.objects.filter(pk=instance.project_id).update(updated_at=timezone.now())
+    bump_table_version(Project)
+
+
+@receiver(post_save, sender=Task)
+def rekey_task_rollups(sender, instance, created, update_fields=None, **kwargs):
+    # Rollup keys carry the task's project; spend moves with the task to its new project
+    if created or (update_fields is not None and 'project' not in update_fields):
+        return
+    if DailyRollup.objects.filter(task_id=instance.pk).exclude(project_id=instance.project_id).exists():
+        rollups.rekey_task(instance.pk)
+
+
+@receiver(pre_delete, sender=Task)
+def detach_task_rollups(sender, instance, **kwargs):
+    # Deleting a task nulls it on its entries, which then roll up under taskless keys
+    rollups.detach_task(instance.pk, instance.project_id)
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    instrumentation.install(connection)
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Project, ProjectMembership, Task, TimeEntry
+from .serializers import ProjectSerializer, TaskSerializer, TimeEntrySerializer
+
+# Rows per kind in one response; has_more tells the client to ask again with the new cursor
+SYNC_MAX_ROWS = 500
+# auto_now stamps updated_at at save time, not at commit, so a row may commit
+# after a sync has read past its timestamp. The first page of every sync
+# re-reads rows this recent; clients apply rows by id, so repeats are harmless.
+SYNC_RECHECK = timedelta(seconds=10)
+
+KINDS = ('time_entries', 'tasks', 'projects')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        positions = {
+            kind: (datetime.fromisoformat(state[kind][0]), int(state[kind][1])) if state[kind] else None
+            for kind in KINDS
+        }
+    except (binascii.Error, json.JSONDecodeError, UnicodeDecodeError, TypeError, KeyError, IndexError, ValueError):
+        raise InvalidCursor('Invalid sync cursor.')
+    return {**state, **positions}
+
+
+def _visible_since(user) -> Optional[datetime]:
+    if user.is_staff or user.is_superuser:
+        return None
+    return getattr(getattr(user, 'profile', None), 'visible_since', None)
+
+
+def _visible_key(visible_since: Optional[datetime]) -> Optional[str]:
+    return visible_since.isoformat() if visible_since else None
+
+
+def cursor_at(user, updated_at: datetime) -> str:
+    """A cursor for `user` positioned at `updated_at` for every kind, as if it had synced then."""
+    position = [updated_at.isoformat(), 0]
+    return encode_cursor({
+        **{kind: position for kind in KINDS},
+        'visible_since': _visible_key(_visible_since(user)),
+        'more': False,
+    })
+
+
+def _querysets(user, visible_since, employee_id=None) -> Dict[str, Any]:
+    """Rows of each kind the user may hold, deleted ones included, with the read scope of the list endpoints."""
+    entries = TimeEntry.objects.select_related('task', 'task__project')
+    projects = Project.objects.all()
+    if user.is_staff or user.is_superuser:
+        if employee_id:
+            entries = entries.filter(employee_id=employee_id)
+    else:
+        entries = entries.filter(employee=user)
+        # Entries before the latest settlement stay hidden, as in the entry list
+        if visible_since:
+            entries = entries.filter(created_at__gte=visible_since)
+        # Projects the user left come back as tombstones (membership changes touch the project)
+        projects = projects.annotate(
+            is_member=Exists(ProjectMembership.objects.filter(project=OuterRef('pk'), user=user))
+        )
+    return {'time_entries': entries, 'tasks': Task.objects.all(), 'projects': projects}
+
+
+def _is_tombstone(kind: str, row) -> bool:
+    return row.is_deleted or (kind == 'projects' and getattr(row, 'is_member', True) is False)
+
+
+SERIALIZERS = {'time_entries': TimeEntrySerializer, 'tasks': TaskSerializer, 'projects': ProjectSerializer}
+
+
+def changes(request, cursor: Optional[str] = None, employee_id=None) -> Dict[str, Any]:
+    """Entries, tasks and projects changed since `cursor`, plus the cursor to pass next time.
+
+    Each kind comes back as {'changed': [rows as the list endpoints render them],
+    'deleted': [ids]}. Without a cursor this is a full load of the live rows.
+    A cursor is only valid with the same user and `employee` filter it was
+    issued for; when a settlement has since hidden older entries, the
+    response has reset=True and holds a full load to replace the local copy.
+    """
+    user = request.user
+    visible_since = _visible_since(user)
+    visible_key = _visible_key(visible_since)
+    state = decode_cursor(cursor) if cursor else None
+    reset = state is not None and state.get('visible_since') != visible_key
+    if reset:
+        state = None
+
+    recheck_from = timezone.now() - SYNC_RECHECK
+    result: Dict[str, Any] = {}
+    positions: Dict[str, list] = {}
+    has_more = False
+    for kind, qs in _querysets(user, visible_since, employee_id).items():
+        position = state[kind] if state else None
+        if state is None:
+            qs = qs.filter(is_deleted=False)
+        elif position is not None:
+            updated_at, pk = position
+            if not state.get('more') and updated_at > recheck_from:
+                updated_at, pk = recheck_from, 0
+            qs = qs.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk))
+        rows = list(qs.order_by('updated_at', 'pk')[:SYNC_MAX_ROWS + 1])
+        if len(rows) > SYNC_MAX_ROWS:
+            rows = rows[:SYNC_MAX_ROWS]
+            has_more = True
+        live = [row for row in rows if not _is_tombstone(kind, row)]
+        result[kind] = {
+            'changed': SERIALIZERS[kind](live, many=True, context={'request': request}).data,
+            # A full load has nothing to delete on the client
+            'deleted': [row.pk for row in rows if _is_tombstone(kind, row)] if state else [],
+        }
+        if rows:
+            last = rows[-1]
+            # Never move a cursor backwards past what the client already has
+            if position is None or (last.updated_at, last.pk) > position:
+                position = (last.updated_at, last.pk)
+        positions[kind] = [position[0].isoformat(), position[1]] if position else None
+
+    next_state = {**positions, 'visible_since': visible_key, 'more': has_more}
+    return {**result, 'cursor': encode_cursor(next_state), 'has_more': has_more, 'reset': reset}
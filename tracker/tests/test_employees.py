@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from tracker.models import EmployeeProfile
+
+User = get_user_model()
+
+
+class EmployeeListQueriesTests(APITestCase):
+    """Listing employees costs the same queries however many there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', is_staff=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def add_employees(self, n):
+        start = User.objects.count()
+        for i in range(start, start + n):
+            user = User.objects.create_user(f'employee{i:03d}')
+            EmployeeProfile.objects.create(user=user, hourly_rate_toman=1000 * i, employee_code=f'E{i:03d}')
+
+    def list_queries(self, url):
+        # One query for the page (profiles joined in), none per employee
+        for n in (3, 20):
+            self.add_employees(n)
+            with self.subTest(url=url, employees=User.objects.count()), self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), User.objects.count())
+        return response.data['results']
+
+    def test_list_with_profile_fields(self):
+        rows = self.list_queries('/api/employees/')
+        self.assertEqual(rows[1]['employee_code'], 'E001')
+
+    def test_list_with_sparse_fields(self):
+        rows = self.list_queries('/api/employees/?fields=id,username')
+        self.assertEqual(set(rows[0]), {'id', 'username'})
+
+    def test_sparse_fields_with_profile_field(self):
+        rows = self.list_queries('/api/employees/?fields=id,role')
+        self.assertEqual(set(rows[0]), {'id', 'role'})
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet, TimeEntryViewSet, ReportsViewSet, EmployeeViewSet, ProjectViewSet, ProjectMembershipViewSet, SettlementViewSet, healthcheck, my_income, my_profile
+from .views import TaskViewSet, TimeEntryViewSet, ReportsViewSet, EmployeeViewSet, ProjectViewSet, ProjectMembershipViewSet, SettlementViewSet, healthcheck, my_income, my_profile, request_metrics, sync_changes
 
 router = DefaultRouter()
 router.register('tasks', TaskViewSet, basename='task')
@@ -15,6 +15,8 @@ urlpatterns = [
     path('health/', healthcheck, name='healthcheck'),
     path('me/income/', my_income, name='my_income'),
     path('me/profile/', my_profile, name='my_profile'),
+    path('metrics/', request_metrics, name='request_metrics'),
+    path('sync/', sync_changes, name='sync'),
     path('', include(router.urls)),
 ]
 
@@ -1,17 +1,47 @@
-from datetime import datetime
-
+import hashlib
+import io
+import json
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Sum
-from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from django.utils.crypto import constant_time_compare
+from django.db import transaction
+from django.db.models import F, Q
+from adrf.decorators import api_view
+from rest_framework import status
+from rest_framework.decorators import action, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
-from .models import Task, TimeEntry, TimeEntryEdit, Project, ProjectMembership, EmployeeProfile, ProjectMonthlyBudget, Settlement
+from . import instrumentation, ledger, metrics, rates, report_cache, rollups, sync, viewsets
+from .models import Task, TimeEntry, TimeEntryEdit, Project, ProjectMembership, EmployeeProfile, HourlyRate, Settlement
 from django.contrib.auth import get_user_model
-from .serializers import TaskSerializer, TimeEntrySerializer, EmployeeSerializer
+from .serializers import TaskSerializer, TimeEntrySerializer, EmployeeSerializer, ProjectSerializer, MembershipSerializer, SettlementSerializer
 from .permissions import IsAdmin, IsOwnerOrAdmin
-from .reporting import daily_totals, weekly_totals, monthly_totals, monthly_task_pie, task_breakdown
+from .imports import READERS, import_entries
+from .exports import ENTRY_HEADER, PAYROLL_HEADER, entry_rows, export_response, payroll_rows
+from .periods import current_month
+from .report_cache import acached_report, cached_report
+from .pagination import TimeEntryPagination, SettlementPagination, TaskPagination, EmployeePagination
+from .reporting import daily_totals, weekly_totals, monthly_totals, monthly_task_pie, task_breakdown, dashboard, employee_income, employees_income, project_spend, projects_budget
+
+
+def conditional_response(request, data):
+    """Response with a content ETag; 304 when the client already has this payload."""
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    etag = '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    return response
 
 
 @api_view(['GET'])
@@ -20,33 +50,49 @@ def healthcheck(request):
     return Response({'status': 'ok'})
 
 
+def prometheus_metrics(request):
+    """Prometheus text exposition; needs `Authorization: Bearer <METRICS_TOKEN>` when that setting is set."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.exposition(), content_type=metrics.CONTENT_TYPE_LATEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def request_metrics(request):
+    """Per-route request aggregates, summed over the worker processes in multiprocess mode."""
+    return Response(instrumentation.snapshot())
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def my_income(request):
-    from datetime import date
-    today = date.today()
-    year, month = today.year, today.month
+async def my_income(request):
+    year, month = current_month()
     user = request.user
-    rate = getattr(getattr(user, 'profile', None), 'hourly_rate_toman', 0)
-    qs = TimeEntry.objects.filter(employee=user, date__year=year, date__month=month, is_deleted=False)
-    minutes = qs.aggregate(total=Sum('duration_minutes'))['total'] or 0
-    income = int(round((minutes / 60) * (rate or 0)))
-    paid = Settlement.objects.filter(employee=user, year=year, month=month).aggregate(total=Sum('amount_toman'))['total'] or 0
-    outstanding = max(income - paid, 0)
-    return Response({
-        'year': year,
-        'month': month,
-        'minutes': minutes,
-        'hourly_rate_toman': rate,
-        'income_toman': income,
-        'paid_toman': paid,
-        'outstanding_toman': outstanding,
-    })
+    data = await acached_report('income', user.id, {'year': year, 'month': month}, lambda: employee_income(user.id, year, month))
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+async def sync_changes(request):
+    """Entries, tasks and projects changed since ?since=<cursor>, with tombstones for deleted rows.
+
+    Admins may pass ?employee= to follow one employee's entries.
+    """
+    user = request.user
+    employee_id = request.query_params.get('employee') if (user.is_staff or user.is_superuser) else None
+    try:
+        data = await sync_to_async(sync.changes)(request, request.query_params.get('since'), employee_id)
+    except sync.InvalidCursor as exc:
+        return Response({'since': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def my_profile(request):
+async def my_profile(request):
     user = request.user
     return Response({
         'id': user.id,
@@ -63,6 +109,9 @@ class TaskViewSet(viewsets.ModelViewSet):
     queryset = Task.objects.all().order_by('-created_at')
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskPagination
+    etag_models = (Task,)
+    list_from_values = True
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -79,22 +128,30 @@ class TaskViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance: Task) -> None:
         instance.is_deleted = True
         instance.deleted_at = timezone.now()
-        instance.save(update_fields=['is_deleted', 'deleted_at'])
+        instance.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
+
+
+BULK_MAX_ENTRIES = 500
+EXPORT_TYPES = ('csv', 'xlsx')
 
 
 class TimeEntryViewSet(viewsets.ModelViewSet):
     serializer_class = TimeEntrySerializer
     permission_classes = [IsOwnerOrAdmin]
+    pagination_class = TimeEntryPagination
+    etag_models = (TimeEntry, Task, Project, EmployeeProfile)
+    list_from_values = True
 
     def get_queryset(self):
         qs = TimeEntry.objects.filter(is_deleted=False).select_related('task', 'task__project', 'employee').order_by('-date', '-start_time')
         user = self.request.user
         if not (user.is_staff or user.is_superuser):
             qs = qs.filter(employee=user)
-            # Hide entries created before the latest settlement timestamp
-            last_settlement = Settlement.objects.filter(employee=user).order_by('-settled_at').first()
-            if last_settlement:
-                qs = qs.filter(created_at__gte=last_settlement.settled_at)
+            # Hide entries created before the latest settlement timestamp (kept on the profile by settle)
+            qs = qs.filter(
+                Q(employee__profile__visible_since__isnull=True)
+                | Q(created_at__gte=F('employee__profile__visible_since'))
+            )
         # Optional project filter
         project_id = self.request.query_params.get('project')
         if project_id:
@@ -115,10 +172,56 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
         old_values = {
             'is_deleted': instance.is_deleted,
         }
-        instance.is_deleted = True
-        instance.edited_by = user
-        instance.save(update_fields=['is_deleted', 'edited_by'])
-        TimeEntryEdit.objects.create(time_entry=instance, editor=user, old_values=old_values, new_values={'is_deleted': True})
+        old_contribution = rollups.contribution(instance)
+        with transaction.atomic():
+            instance.is_deleted = True
+            instance.edited_by = user
+            instance.save(update_fields=['is_deleted', 'edited_by', 'updated_at'])
+            TimeEntryEdit.objects.create(time_entry=instance, editor=user, old_values=old_values, new_values={'is_deleted': True})
+            rollups.apply(old_contribution, None)
+
+    @action(detail=False, methods=['POST'])
+    def bulk(self, request):
+        items = request.data if isinstance(request.data, list) else request.data.get('entries')
+        if not isinstance(items, list):
+            return Response({'entries': 'Expected a list of time entries.'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = [item['id'] for item in items if isinstance(item, dict) and isinstance(item.get('id'), int)]
+        task_ids = [item['task'] for item in items if isinstance(item, dict) and isinstance(item.get('task'), int)]
+        context = {
+            **self.get_serializer_context(),
+            'bulk': True,
+            # Updates are limited to entries this user may see, like single updates
+            'instances': self.get_queryset().in_bulk(ids) if ids else {},
+            'tasks': Task.objects.select_related('project').in_bulk(task_ids) if task_ids else {},
+        }
+        serializer = TimeEntrySerializer(data=items, many=True, max_length=BULK_MAX_ENTRIES, context=context)
+        serializer.is_valid(raise_exception=True)
+        entries = serializer.save()
+        # 201 only when the batch created something; a batch of updates is a plain 200
+        code = status.HTTP_201_CREATED if len(ids) < len(items) else status.HTTP_200_OK
+        return Response(TimeEntrySerializer(entries, many=True, context=context).data, status=code)
+
+    @action(detail=False, methods=['GET'])
+    def export(self, request):
+        kind = request.query_params.get('type') or 'csv'
+        if kind not in EXPORT_TYPES:
+            return Response({'type': f'Expected one of: {", ".join(EXPORT_TYPES)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        filename = f'time-entries-{timezone.localdate().isoformat()}'
+        return export_response(request, kind, ENTRY_HEADER, entry_rows(self.get_queryset()), filename)
+
+    @action(detail=False, methods=['POST'], url_path='import', permission_classes=[IsAdmin], parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'This field is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        kind = request.query_params.get('type') or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if kind not in READERS:
+            return Response({'type': f'Expected one of: {", ".join(sorted(READERS))}.'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        # Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are already on disk; rows are read lazily from there
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_entries(READERS[kind](stream), editor=request.user, dry_run=dry_run)
+        return Response(report)
 
     @action(detail=True, methods=['GET'], permission_classes=[IsAdmin])
     def audit(self, request, pk=None):
@@ -130,72 +233,113 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
 class ReportsViewSet(viewsets.ViewSet):
     permission_classes = [IsAdmin]
 
+    def _year_month(self, request):
+        default_year, default_month = current_month()
+        try:
+            year = int(request.query_params.get('year') or default_year)
+            month = int(request.query_params.get('month') or default_month)
+        except ValueError:
+            raise ValidationError({'year': 'Expected a numeric year and month.'})
+        if not 1 <= month <= 12:
+            raise ValidationError({'month': 'Expected a month from 1 to 12.'})
+        return year, month
+
+    def _date(self, request, name):
+        try:
+            return date.fromisoformat(request.query_params.get(name) or '')
+        except ValueError:
+            raise ValidationError({name: 'Expected a date as YYYY-MM-DD.'})
+
     @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/daily')
-    def daily(self, request, employee_id=None):
+    async def daily(self, request, employee_id=None):
         start = request.query_params.get('start')
         end = request.query_params.get('end')
-        data = daily_totals(int(employee_id), start, end)
+        employee_id = int(employee_id)
+        data = await acached_report('daily', employee_id, {'start': start, 'end': end}, lambda: daily_totals(employee_id, start, end))
         return Response({'series': data})
 
     @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/weekly')
-    def weekly(self, request, employee_id=None):
+    async def weekly(self, request, employee_id=None):
         start = request.query_params.get('start')
         end = request.query_params.get('end')
-        data = weekly_totals(int(employee_id), start, end)
+        employee_id = int(employee_id)
+        data = await acached_report('weekly', employee_id, {'start': start, 'end': end}, lambda: weekly_totals(employee_id, start, end))
         return Response({'series': data})
 
     @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/monthly')
-    def monthly(self, request, employee_id=None):
+    async def monthly(self, request, employee_id=None):
         start = request.query_params.get('start')
         end = request.query_params.get('end')
-        data = monthly_totals(int(employee_id), start, end)
+        employee_id = int(employee_id)
+        data = await acached_report('monthly', employee_id, {'start': start, 'end': end}, lambda: monthly_totals(employee_id, start, end))
         return Response({'series': data})
 
     @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/pie')
-    def pie(self, request, employee_id=None):
+    async def pie(self, request, employee_id=None):
         year = int(request.query_params.get('year'))
         month = int(request.query_params.get('month'))
-        data = monthly_task_pie(int(employee_id), year, month)
+        employee_id = int(employee_id)
+        data = await acached_report('pie', employee_id, {'year': year, 'month': month}, lambda: monthly_task_pie(employee_id, year, month))
         return Response({'series': data})
 
+    @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/dashboard')
+    async def dashboard(self, request, employee_id=None):
+        start, end = self._date(request, 'start'), self._date(request, 'end')
+        if end < start:
+            raise ValidationError({'end': 'Expected a date on or after start.'})
+        year, month = self._year_month(request)
+        employee_id = int(employee_id)
+        params = {'start': start, 'end': end, 'year': year, 'month': month}
+        data = await acached_report('dashboard', employee_id, params, lambda: dashboard(employee_id, start, end, year, month))
+        return conditional_response(request, data)
+
     @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/tasks')
-    def tasks(self, request, employee_id=None):
+    async def tasks(self, request, employee_id=None):
         start = request.query_params.get('start')
         end = request.query_params.get('end')
-        data = task_breakdown(int(employee_id), start, end)
+        employee_id = int(employee_id)
+        data = await acached_report('tasks', employee_id, {'start': start, 'end': end}, lambda: task_breakdown(employee_id, start, end))
         return Response({'tasks': data})
 
     @action(detail=False, methods=['GET'], url_path='employee/(?P<employee_id>[^/.]+)/income')
-    def income(self, request, employee_id=None):
-        from datetime import date
-        today = date.today()
-        year, month = today.year, today.month
-        rate = 0
-        try:
-            rate = EmployeeProfile.objects.get(user_id=employee_id).hourly_rate_toman
-        except EmployeeProfile.DoesNotExist:
-            rate = 0
-        minutes = TimeEntry.objects.filter(employee_id=employee_id, date__year=year, date__month=month, is_deleted=False).aggregate(total=Sum('duration_minutes'))['total'] or 0
-        income = int((minutes / 60) * rate)
-        paid = Settlement.objects.filter(employee_id=employee_id, year=year, month=month).aggregate(total=Sum('amount_toman'))['total'] or 0
-        outstanding = max(income - paid, 0)
-        return Response({'year': year, 'month': month, 'minutes': minutes, 'hourly_rate_toman': rate, 'income_toman': income, 'paid_toman': paid, 'outstanding_toman': outstanding})
+    async def income(self, request, employee_id=None):
+        year, month = current_month()
+        employee_id = int(employee_id)
+        data = await acached_report('income', employee_id, {'year': year, 'month': month}, lambda: employee_income(employee_id, year, month))
+        return Response(data)
+
+    @action(detail=False, methods=['GET'], url_path='income')
+    async def income_summary(self, request):
+        year, month = self._year_month(request)
+        data = await acached_report('income_summary', None, {'year': year, 'month': month}, lambda: employees_income(year, month))
+        return Response({'year': year, 'month': month, 'employees': data})
+
+    @action(detail=False, methods=['GET'], url_path='income/export')
+    def income_export(self, request):
+        year, month = self._year_month(request)
+        kind = request.query_params.get('type') or 'csv'
+        if kind not in EXPORT_TYPES:
+            return Response({'type': f'Expected one of: {", ".join(EXPORT_TYPES)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        data = cached_report('income_summary', None, {'year': year, 'month': month}, lambda: employees_income(year, month))
+        return export_response(request, kind, PAYROLL_HEADER, payroll_rows(data), f'payroll-{year}-{month:02d}')
 
     @action(detail=False, methods=['GET'], url_path='project/(?P<project_id>[^/.]+)/budget')
-    def project_budget(self, request, project_id=None):
-        from datetime import date
-        today = date.today()
-        year, month = today.year, today.month
-        budget = ProjectMonthlyBudget.objects.filter(project_id=project_id, year=year, month=month).first()
-        budget_toman = budget.budget_toman if budget else 0
-        minutes = TimeEntry.objects.filter(task__project_id=project_id, date__year=year, date__month=month, is_deleted=False).aggregate(total=Sum('duration_minutes'))['total'] or 0
-        # Sum cost = sum over entries employee_rate * hours; approximate using current rate
-        # For simplicity multiply by employee current rate
-        spent = 0
-        for te in TimeEntry.objects.filter(task__project_id=project_id, date__year=year, date__month=month, is_deleted=False).select_related('employee'):
-            rate = getattr(getattr(te.employee, 'profile', None), 'hourly_rate_toman', 0)
-            spent += int((te.duration_minutes/60) * (rate or 0))
-        return Response({'year': year, 'month': month, 'budget_toman': budget_toman, 'spent_toman': spent})
+    async def project_budget(self, request, project_id=None):
+        year, month = self._year_month(request)
+        project_id = int(project_id)
+        params = {'project': project_id, 'year': year, 'month': month}
+        data = await acached_report('project_budget', None, params, lambda: project_spend(project_id, year, month))
+        return Response({'year': year, 'month': month, **data})
+
+    @action(detail=False, methods=['GET'], url_path='projects/budget')
+    async def budgets(self, request):
+        year, month = self._year_month(request)
+        data = await acached_report('projects_budget', None, {'year': year, 'month': month}, lambda: projects_budget(year, month))
+        return Response({'year': year, 'month': month, 'projects': data})
+
+    @action(detail=False, methods=['GET'], url_path='cache')
+    def cache_stats(self, request):
+        return Response(report_cache.stats())
 
 
 User = get_user_model()
@@ -205,30 +349,69 @@ class EmployeeViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.filter(is_active=True).order_by('username')
     serializer_class = EmployeeSerializer
     permission_classes = [IsAdmin]
+    pagination_class = EmployeePagination
+    etag_models = (User, EmployeeProfile)
 
-    @action(detail=True, methods=['PATCH'], permission_classes=[IsAdmin])
+    def _requested_fields(self):
+        # Sparse fieldsets, e.g. ?fields=id,username for pickers
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [f.strip() for f in fields.split(',') if f.strip()]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        fields = self._requested_fields()
+        if fields is None or set(fields) & set(EmployeeSerializer.PROFILE_FIELDS):
+            qs = qs.select_related('profile')
+        return qs
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self._requested_fields()
+        if fields is not None and self.action in ['list', 'retrieve']:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=True, methods=['GET', 'PATCH'], permission_classes=[IsAdmin])
     def rate(self, request, pk=None):
+        """GET: the rate history. PATCH: a new rate from effective_from (default today) on.
+
+        Entries from effective_from until the next rate change are re-priced;
+        months before it keep their cost.
+        """
         user = self.get_object()
+        if request.method == 'GET':
+            history = HourlyRate.objects.filter(employee=user).order_by('effective_from').values('effective_from', 'hourly_rate_toman')
+            return Response(list(history))
         rate = int(request.data.get('hourly_rate_toman', 0))
-        profile, _ = EmployeeProfile.objects.get_or_create(user=user)
-        profile.hourly_rate_toman = max(rate, 0)
-        profile.save(update_fields=['hourly_rate_toman'])
-        return Response({'user_id': user.id, 'hourly_rate_toman': profile.hourly_rate_toman})
+        effective_from = request.data.get('effective_from')
+        if effective_from:
+            try:
+                effective_from = date.fromisoformat(str(effective_from))
+            except ValueError:
+                effective_from = None
+            if effective_from is None or effective_from > timezone.localdate():
+                return Response({'effective_from': 'Expected a date (YYYY-MM-DD) no later than today.'}, status=status.HTTP_400_BAD_REQUEST)
+        repriced = rates.set_rate(user.id, max(rate, 0), effective_from or None)
+        return Response({
+            'user_id': user.id,
+            'hourly_rate_toman': rates.rate_on(user.id, timezone.localdate()),
+            'repriced_entries': repriced,
+        })
 
     @action(detail=True, methods=['POST'], permission_classes=[IsAdmin])
     def settle(self, request, pk=None):
-        from datetime import date
         user = self.get_object()
-        today = date.today()
-        year, month = today.year, today.month
-        # compute income
-        rate = getattr(getattr(user, 'profile', None), 'hourly_rate_toman', 0)
-        minutes = TimeEntry.objects.filter(employee=user, date__year=year, date__month=month, is_deleted=False).aggregate(total=Sum('duration_minutes'))['total'] or 0
-        income = int(round((minutes / 60) * (rate or 0)))
-        paid = Settlement.objects.filter(employee=user, year=year, month=month).aggregate(total=Sum('amount_toman'))['total'] or 0
-        outstanding = max(income - paid, 0)
-        if outstanding > 0:
-            Settlement.objects.create(employee=user, year=year, month=month, amount_toman=outstanding)
+        year, month = current_month()
+        with transaction.atomic():
+            # Concurrent settles of the same month queue on the ledger row, so the second sees the first payment
+            month_ledger = ledger.locked(user.id, year, month)
+            outstanding = employee_income(user.id, year, month)['outstanding_toman']
+            if outstanding > 0:
+                settlement = Settlement.objects.create(employee=user, year=year, month=month, amount_toman=outstanding)
+                ledger.add_paid(month_ledger, outstanding)
+                EmployeeProfile.objects.update_or_create(user=user, defaults={'visible_since': settlement.settled_at})
+                metrics.settlement_written(outstanding)
         return Response({'user_id': user.id, 'year': year, 'month': month, 'settled_amount_toman': outstanding})
 
     @action(detail=False, methods=['POST'], permission_classes=[IsAdmin])
@@ -259,34 +442,24 @@ class EmployeeViewSet(viewsets.ReadOnlyModelViewSet):
         profile.employee_code = employee_code
         profile.hourly_rate_toman = max(hourly_rate_toman, 0)
         profile.save()
+        # The first rate covers all earlier work
+        HourlyRate.objects.create(employee=user, effective_from=rates.FIRST_DAY, hourly_rate_toman=profile.hourly_rate_toman)
         data = EmployeeSerializer(user).data
         return Response(data, status=status.HTTP_201_CREATED)
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all().order_by('-created_at')
+    serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
+    etag_models = (Project, ProjectMembership)
+    list_from_values = True
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdmin()]
         return super().get_permissions()
 
-    def get_serializer(self, *args, **kwargs):
-        from .serializers import serializers
-        class _ProjectSerializer(serializers.ModelSerializer):
-            class Meta:
-                model = Project
-                fields = ['id', 'name', 'created_by', 'created_at', 'updated_at', 'is_deleted', 'deleted_at']
-                read_only_fields = ['id', 'created_by', 'created_at', 'updated_at', 'deleted_at']
-
-            def create(self, validated_data):
-                validated_data['created_by'] = self.context['request'].user
-                return super().create(validated_data)
-
-        kwargs.setdefault('context', self.get_serializer_context())
-        return _ProjectSerializer(*args, **kwargs)
-
     def get_queryset(self):
         qs = super().get_queryset()
         # Non-admins: only projects where they are members
@@ -298,27 +471,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance: Project) -> None:
         instance.is_deleted = True
         instance.deleted_at = timezone.now()
-        instance.save(update_fields=['is_deleted', 'deleted_at'])
+        instance.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
 
 
 class ProjectMembershipViewSet(viewsets.ModelViewSet):
     queryset = ProjectMembership.objects.all().select_related('project', 'user').order_by('-created_at')
+    serializer_class = MembershipSerializer
     permission_classes = [IsAdmin]
-
-    def get_serializer(self, *args, **kwargs):
-        from .serializers import serializers
-        class _MembershipSerializer(serializers.ModelSerializer):
-            class Meta:
-                model = ProjectMembership
-                fields = ['id', 'project', 'user', 'added_by', 'created_at']
-                read_only_fields = ['id', 'added_by', 'created_at']
-
-            def create(self, validated_data):
-                validated_data['added_by'] = self.context['request'].user
-                return super().create(validated_data)
-
-        kwargs.setdefault('context', self.get_serializer_context())
-        return _MembershipSerializer(*args, **kwargs)
+    etag_models = (ProjectMembership,)
+    list_from_values = True
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -330,17 +491,11 @@ class ProjectMembershipViewSet(viewsets.ModelViewSet):
 
 class SettlementViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Settlement.objects.all().select_related('employee').order_by('-settled_at')
+    serializer_class = SettlementSerializer
     permission_classes = [IsAdmin]
-
-    def get_serializer(self, *args, **kwargs):
-        from .serializers import serializers
-        class _SettlementSerializer(serializers.ModelSerializer):
-            employee_username = serializers.CharField(source='employee.username', read_only=True)
-            class Meta:
-                model = Settlement
-                fields = ['id', 'employee', 'employee_username', 'year', 'month', 'amount_toman', 'settled_at']
-        kwargs.setdefault('context', self.get_serializer_context())
-        return _SettlementSerializer(*args, **kwargs)
+    pagination_class = SettlementPagination
+    etag_models = (Settlement, User)
+    list_from_values = True
 
     def get_queryset(self):
         qs = super().get_queryset()
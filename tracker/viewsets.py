@@ -0,0 +1,84 @@
+import hashlib
+import json
+
+from adrf import mixins as async_mixins
+from adrf.viewsets import GenericViewSet, ViewSet
+from asgiref.sync import sync_to_async
+from rest_framework import mixins, status
+from rest_framework.response import Response
+
+from . import report_cache
+
+__all__ = ['ViewSet', 'ReadOnlyModelViewSet', 'ModelViewSet']
+
+
+class ReadOnlyModelViewSet(async_mixins.ListModelMixin, async_mixins.RetrieveModelMixin, GenericViewSet):
+    """list/retrieve served as async views.
+
+    The handlers keep their DRF names so routers, self.action checks and
+    permissions see the same actions as before. Any sync handler on the
+    viewset is run in the request's worker thread by adrf's async dispatch.
+
+    Viewsets listing the tables their responses are built from in
+    `etag_models` get an ETag on list and retrieve. It hashes the table
+    versions kept by report_cache with the user and URL, so a matching
+    If-None-Match is answered with 304 before any query runs.
+
+    With `list_from_values` set, list renders rows of queryset.values()
+    through the serializer's ValuesSerializerMixin instead of building
+    model instances; the JSON is the same.
+    """
+    etag_models = ()
+    list_from_values = False
+
+    async def list(self, request, *args, **kwargs):
+        return await self._conditional(self.alist, request, *args, **kwargs)
+
+    async def retrieve(self, request, *args, **kwargs):
+        return await self._conditional(self.aretrieve, request, *args, **kwargs)
+
+    async def alist(self, *args, **kwargs):
+        if not self.list_from_values:
+            return await super().alist(*args, **kwargs)
+        serializer_class = self.get_serializer_class()
+        lookups = serializer_class.values_lookups()
+        # KeysetPagination reads the position from every ordering field of the edge rows
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        for name in [ordering] if isinstance(ordering, str) else ordering:
+            if name.lstrip('-') not in lookups:
+                lookups.append(name.lstrip('-'))
+        queryset = (await self.afilter_queryset(self.get_queryset())).values(*lookups)
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return await self.get_apaginated_response(serializer_class.represent_values(page))
+        rows = await sync_to_async(list)(queryset)
+        return Response(serializer_class.represent_values(rows))
+
+    def get_etag(self, request) -> str:
+        user = request.user
+        key = [
+            report_cache.table_versions(self.etag_models),
+            user.pk,
+            user.is_staff or user.is_superuser,
+            request.build_absolute_uri(),
+            request.accepted_renderer.format,
+        ]
+        return '"%s"' % hashlib.md5(json.dumps(key).encode()).hexdigest()
+
+    async def _conditional(self, handler, request, *args, **kwargs):
+        if not self.etag_models:
+            return await handler(request, *args, **kwargs)
+        etag = await sync_to_async(self.get_etag)(request)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = await handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Browsers keep the body and revalidate with If-None-Match on every request
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ModelViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.DestroyModelMixin, ReadOnlyModelViewSet):
+    """Async reads, sync writes (serializer validation and transactions stay as they are)."""